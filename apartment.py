@@ -1,6 +1,31 @@
-from dataclasses import dataclass
+import re
+from dataclasses import dataclass, fields
+from typing import Optional
 
-@dataclass
+_NUMBER = re.compile(r'\d[\d.,]*')
+_THOUSANDS = re.compile(r'\d{1,3}(?:\.\d{3})+')
+_WARM_MARKERS = ('warm', 'gesamt', 'inkl')
+
+
+def parse_german_number(text):
+    """Erste Zahl im deutschen Format: '1.050,00 €' -> 1050.0, '78,5 m²' -> 78.5"""
+    if not text:
+        return None
+    match = _NUMBER.search(text)
+    if not match:
+        return None
+    number = match.group(0).rstrip('.,')
+    if ',' in number:
+        number = number.replace('.', '').replace(',', '.')
+    elif _THOUSANDS.fullmatch(number):
+        number = number.replace('.', '')
+    try:
+        return float(number)
+    except ValueError:
+        return None
+
+
+@dataclass(slots=True)
 class Apartment:
     title: str
     price: str
@@ -10,7 +35,40 @@ class Apartment:
     url: str
     source: str
     description: str = ""
-    
+    listing_id: str = ""
+    price_value: Optional[float] = None
+    cold_rent: Optional[float] = None
+    warm_rent: Optional[float] = None
+    rooms_value: Optional[float] = None
+    size_value: Optional[float] = None
+
+    def __post_init__(self):
+        # Zahlen einmalig beim Extrahieren parsen, Filter arbeiten nur noch darauf
+        if self.price_value is None:
+            self.price_value = parse_german_number(self.price)
+        if self.cold_rent is None and self.warm_rent is None and self.price_value is not None:
+            if any(marker in self.price.lower() for marker in _WARM_MARKERS):
+                self.warm_rent = self.price_value
+            else:
+                self.cold_rent = self.price_value
+        if self.rooms_value is None:
+            self.rooms_value = parse_german_number(self.rooms)
+        if self.size_value is None:
+            self.size_value = parse_german_number(self.size)
+
+    def apply_details(self, details):
+        """Angaben der Detailseite übernehmen und die Zahlen neu parsen"""
+        if details.get('rooms'):
+            self.rooms = details['rooms']
+            self.rooms_value = parse_german_number(self.rooms)
+        if details.get('size'):
+            self.size = details['size']
+            self.size_value = parse_german_number(self.size)
+        if details.get('description'):
+            self.description = details['description']
+        if details.get('warm_rent'):
+            self.warm_rent = parse_german_number(details['warm_rent'])
+
     def to_dict(self):
         return {
             'title': self.title,
@@ -20,10 +78,27 @@ class Apartment:
             'size': self.size,
             'url': self.url,
             'source': self.source,
-            'description': self.description
+            'description': self.description,
+            'listing_id': self.listing_id,
+            'price_value': self.price_value,
+            'cold_rent': self.cold_rent,
+            'warm_rent': self.warm_rent,
+            'rooms_value': self.rooms_value,
+            'size_value': self.size_value
         }
-    
+
+    @classmethod
+    def from_dict(cls, data):
+        names = {f.name for f in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in names})
+
+    @property
+    def canonical_id(self):
+        """Portal + Anzeigen-ID, ohne ID die URL ohne Query und Fragment"""
+        if self.listing_id:
+            return f"{self.source}:{self.listing_id}"
+        return self.url.split('#', 1)[0].split('?', 1)[0]
+
     def get_hash(self):
         import hashlib
-        content = f"{self.title}{self.price}{self.location}{self.url}"
-        return hashlib.md5(content.encode()).hexdigest()
+        return hashlib.md5(self.canonical_id.encode()).hexdigest()
@@ -1,46 +1,144 @@
 
-import requests
-import time
+import argparse
 import json
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from datetime import datetime
 import os
-import re
 import logging
-from apartment import Apartment
-from immobilienscout24_scraper import Immobilienscout24Scraper
-from wg_gesucht_scraper import WgGesuchtScraper
-from ebay_kleinanzeigen_scraper import EbayKleinanzeigenScraper
-from notification_manager import NotificationManager
+from collections import Counter
+from datetime import datetime
+from functools import cached_property
+from fetch_engine import FetchEngine, FetchJob
+from metrics import registry as metrics, profile
 
 # Logging konfigurieren
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Portal (`source`) -> Attribut des Scrapers, über "scraping.portals" auswählbar
+PORTALS = {
+    "ImmobilienScout24": "immoscout_scraper",
+    "WG-Gesucht": "wggesucht_scraper",
+    "eBay Kleinanzeigen": "ebay_scraper",
+}
+
+# Gesehene Wohnungen vor dem SQLite-Store; ihre Hashes passen nicht zu den kanonischen IDs
+LEGACY_SEEN_FILE = 'seen_apartments.json'
+SEEDING_PROGRESS_FILE = f"{LEGACY_SEEN_FILE}.seeding"
+
 class ApartmentScraper:
+    """Einzelner Suchauftrag aus scraper_config.json
+
+    Session, Scraper, Speicher und Benachrichtigung werden erst beim ersten
+    Zugriff gebaut (und ihre Module erst dann importiert), damit einmalige
+    Läufe und `stats` schnell starten und nur benötigte Teile geladen werden.
+    """
+
     def __init__(self, config_file='scraper_config.json'):
         self.config = self.load_config(config_file)
-        self.seen_apartments = self.load_seen_apartments()
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
-            'Accept-Language': 'de-DE,de;q=0.9,en;q=0.8',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'DNT': '1',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Sec-Fetch-Dest': 'document',
-            'Sec-Fetch-Mode': 'navigate',
-            'Sec-Fetch-Site': 'none',
-            'Cache-Control': 'max-age=0'
-        })
-        self.immoscout_scraper = Immobilienscout24Scraper(self.config, self.session, logger)
-        self.wggesucht_scraper = WgGesuchtScraper(self.config, self.session, logger)
-        self.ebay_scraper = EbayKleinanzeigenScraper(self.config, self.session, logger)
-        self.notifier = NotificationManager(self.config, logger)
+        # Bekannte Anzeigen, die in diesem Durchlauf erneut gesehen wurden (für die Historie)
+        self.observed_known = []
+        self.price_changes = []
+        # Neue Wohnungen des laufenden Durchlaufs, gesehen erst nach Filter bzw. Zustellung
+        self.in_flight = set()
+        metrics_port = self.config.get("metrics", {}).get("http_port")
+        if metrics_port:
+            metrics.start_http_server(metrics_port)
+            logger.info(f"Metriken unter http://127.0.0.1:{metrics_port}/metrics")
+
+    @cached_property
+    def seen_apartments(self):
+        return self.load_seen_apartments()
+
+    @cached_property
+    def session(self):
+        from rate_limiter import BROWSER_HEADERS, RateLimitedSession
+        session = RateLimitedSession(self.config, logger)
+        session.headers.update(BROWSER_HEADERS)
+        replay_config = self.config.get("replay", {})
+        if replay_config.get("mode"):
+            import replay
+            replay.install(session, replay_config["mode"], replay_config.get("directory", 'recordings'))
+            logger.info(f"HTTP-{replay_config['mode']} aktiv: {replay_config.get('directory', 'recordings')}")
+        return session
+
+    @cached_property
+    def response_cache(self):
+        from response_cache import ResponseCache
+        return ResponseCache.from_config(self.config, logger)
+
+    @cached_property
+    def immoscout_scraper(self):
+        from immobilienscout24_scraper import Immobilienscout24Scraper
+        return Immobilienscout24Scraper(self.config, self.session, logger, self.response_cache)
+
+    @cached_property
+    def wggesucht_scraper(self):
+        from wg_gesucht_scraper import WgGesuchtScraper
+        return WgGesuchtScraper(self.config, self.session, logger, self.response_cache)
+
+    @cached_property
+    def ebay_scraper(self):
+        from ebay_kleinanzeigen_scraper import EbayKleinanzeigenScraper
+        return EbayKleinanzeigenScraper(self.config, self.session, logger, self.response_cache)
+
+    @cached_property
+    def scrapers(self):
+        """Nur die Scraper der aktivierten Portale (Standard: alle)"""
+        enabled = self.config.get("scraping", {}).get("portals") or list(PORTALS)
+        unknown = [source for source in enabled if source not in PORTALS]
+        if unknown:
+            logger.warning(f"Unbekannte Portale in scraping.portals ignoriert: {', '.join(unknown)}")
+        return [getattr(self, attribute) for source, attribute in PORTALS.items() if source in enabled]
+
+    @cached_property
+    def notifier(self):
+        from notification_manager import NotificationManager
+        return NotificationManager(self.config, logger)
+
+    @cached_property
+    def channels(self):
+        from notification_sinks import MultiChannelNotifier
+        return MultiChannelNotifier(self.config, self.notifier, logger)
+
+    @cached_property
+    def dispatcher(self):
+        from notification_dispatcher import NotificationDispatcher
+        return NotificationDispatcher(self.channels.deliver, self.config, logger,
+                                      on_delivered=self.mark_delivered).start()
+
+    @cached_property
+    def journal(self):
+        from cycle_journal import CycleJournal
+        return CycleJournal(self.config.get("storage", {}).get("journal_path", 'cycle_journal.jsonl'), logger)
+
+    @cached_property
+    def fetch_engine(self):
+        return FetchEngine(self.config, logger)
+
+    @cached_property
+    def criteria_filter(self):
+        from criteria_filter import CriteriaFilter
+        return CriteriaFilter(self.config["search_criteria"])
+
+    @cached_property
+    def enricher(self):
+        if not self.config.get("enrichment", {}).get("enabled"):
+            return None
+        from enrichment import DetailEnricher
+        return DetailEnricher(self.scrapers, self.config, logger)
+
+    @cached_property
+    def history(self):
+        from history_store import HistoryStore
+        return HistoryStore.from_config(self.config, logger)
+
+    @cached_property
+    def duplicate_index(self):
+        from dedup import NearDuplicateIndex
+        return NearDuplicateIndex.from_config(self.config)
+
+    def _built(self, name):
+        """Wert einer Lazy-Property, ohne sie dafür erst zu bauen"""
+        return self.__dict__.get(name)
         
     def load_config(self, config_file):
         """Konfiguration laden oder Standard-Konfiguration erstellen"""
@@ -61,11 +159,110 @@ class ApartmentScraper:
                     "sender_email": "your_email@example.com",
                     "sender_password": "your_password_here",
                     "recipient_email": "recipient@example.com"
+                },
+                "webhook": {
+                    "enabled": False,
+                    "url": "http://localhost:8080/apartments",
+                    "timeout_seconds": 10
+                },
+                "telegram": {
+                    "enabled": False,
+                    "bot_token": "",
+                    "chat_id": "",
+                    "timeout_seconds": 10
+                },
+                "file": {
+                    "enabled": False,
+                    "path": "-"
+                },
+                "dispatch": {
+                    "batch_size": 20,
+                    "batch_seconds": 30,
+                    "max_retries": 5,
+                    "backoff_base_seconds": 5,
+                    "backoff_max_seconds": 300,
+                    "outbox_path": "undelivered_notifications.jsonl"
                 }
             },
             "scraping": {
+                "portals": ["ImmobilienScout24", "WG-Gesucht", "eBay Kleinanzeigen"],
                 "interval_minutes": 30,
-                "max_results_per_site": 20
+                "max_results_per_site": 200,
+                "max_pages_per_site": 10,
+                "stop_after_seen": 3,
+                "max_workers": 8,
+                "per_domain_concurrency": 1,
+                "min_domain_interval_seconds": 2,
+                "domain_overrides": {},
+                "stream_queue_size": 100,
+                "incremental": {
+                    "enabled": True,
+                    "max_fingerprints": 5000
+                },
+                "schedule": {
+                    "min_interval_minutes": 5,
+                    "max_interval_minutes": 120,
+                    "target_new_per_poll": 1.0,
+                    "smoothing": 0.3,
+                    "start_jitter_seconds": 60,
+                    "jitter_fraction": 0.1,
+                    "quiet_hours": [0, 6],
+                    "quiet_factor": 3.0
+                }
+            },
+            "rate_limit": {
+                "requests_per_second": 0.5,
+                "burst": 2,
+                "max_retries": 3,
+                "backoff_base_seconds": 2,
+                "backoff_max_seconds": 120,
+                "circuit_failure_threshold": 5,
+                "circuit_reset_seconds": 600,
+                "hosts": {}
+            },
+            "cache": {
+                "enabled": True,
+                "path": "response_cache.db",
+                "max_entries": 1000,
+                "ttl_hours": 24
+            },
+            "storage": {
+                "seen_path": "seen_apartments.db",
+                "seen_ttl_days": 180,
+                "journal_path": "cycle_journal.jsonl"
+            },
+            "enrichment": {
+                "enabled": False,
+                "max_workers": 4,
+                "per_host_concurrency": 2,
+                "min_host_interval_seconds": 1,
+                "cache_path": "detail_cache.db",
+                "max_entries": 20000
+            },
+            "history": {
+                "enabled": True,
+                "path": "history"
+            },
+            "profiles": {
+                "path": "profiles.json",
+                "state_dir": "profiles",
+                "max_processes": 4
+            },
+            "replay": {
+                "mode": None,
+                "directory": "recordings"
+            },
+            "metrics": {
+                "http_port": None,
+                "file": "metrics.prom",
+                "profile_output": None
+            },
+            "dedup": {
+                "enabled": True,
+                "similarity_threshold": 0.7,
+                "value_tolerance": 0.1,
+                "max_entries": 50000,
+                "path": "duplicate_index.db"
             }
         }
         
@@ -100,151 +297,337 @@ class ApartmentScraper:
             return default_config
     
     def load_seen_apartments(self):
-        """Bereits gesehene Wohnungen laden"""
-        seen_file = 'seen_apartments.json'
+        """Bereits gesehene Wohnungen öffnen, eine alte seen_apartments.json wird einmalig übernommen"""
+        from seen_store import SeenStore
+        storage = self.config.get("storage", {})
+        store = SeenStore(storage.get("seen_path", 'seen_apartments.db'),
+                          ttl_days=storage.get("seen_ttl_days"), logger=logger)
+        seen_file = LEGACY_SEEN_FILE
         if os.path.exists(seen_file):
             try:
                 with open(seen_file, 'r', encoding='utf-8') as f:
-                    return set(json.load(f))
+                    store.add_many(json.load(f))
+                store.flush()
+                os.rename(seen_file, f"{seen_file}.migrated")
+                logger.info(f"{seen_file} nach {store.path} übernommen")
             except json.JSONDecodeError as e:
                 logger.error(f"Fehlerhafte seen_apartments.json gefunden: {e}")
-                logger.info("Starte mit leerem Set...")
                 # Backup erstellen
-                backup_name = f"seen_apartments.json.backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+                backup_name = f"{seen_file}.backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
                 os.rename(seen_file, backup_name)
                 logger.info(f"Fehlerhafte Datei gesichert als: {backup_name}")
-                return set()
             except Exception as e:
-                logger.error(f"Unerwarteter Fehler beim Laden der seen_apartments: {e}")
-                return set()
-        return set()
+                logger.error(f"Unerwarteter Fehler beim Übernehmen der seen_apartments: {e}")
+        return store
     
     def save_seen_apartments(self):
         """Bereits gesehene Wohnungen speichern"""
-        with open('seen_apartments.json', 'w', encoding='utf-8') as f:
-            json.dump(list(self.seen_apartments), f, indent=2)
+        self.seen_apartments.flush()
     
     def scrape_immobilienscout24(self, city):
-        return self.immoscout_scraper.scrape(city)
+        return list(self.immoscout_scraper.scrape(city, self.is_seen))
     
     def scrape_wg_gesucht(self, city):
-        return self.wggesucht_scraper.scrape(city)
+        return list(self.wggesucht_scraper.scrape(city, self.is_seen))
     
     def scrape_ebay_kleinanzeigen(self, city):
-        return self.ebay_scraper.scrape(city)
+        return list(self.ebay_scraper.scrape(city, self.is_seen))
     
     def matches_criteria(self, apartment):
         """Prüfen ob Wohnung den Kriterien entspricht"""
-        criteria = self.config["search_criteria"]
-        
-        # Preis prüfen
-        price_match = re.search(r'(\d+(?:\.\d+)?)', apartment.price.replace(',', '.'))
-        if price_match:
-            price = float(price_match.group(1))
-            if price > criteria["max_price"]:
-                return False
-        
-        # Keywords prüfen
-        text_to_check = f"{apartment.title} {apartment.description}".lower()
-        
-        # Ausgeschlossene Keywords prüfen
-        for excluded in criteria.get("excluded_keywords", []):
-            if excluded.lower() in text_to_check:
-                return False
-        
-        # Gewünschte Keywords prüfen (optional)
-        if criteria.get("keywords"):
-            has_keyword = any(keyword.lower() in text_to_check for keyword in criteria["keywords"])
-            if not has_keyword:
-                return False
-        
-        return True
+        return self.criteria_filter.matches(apartment)
     
     def send_email_notification(self, apartments):
-        self.notifier.send_email_notification(apartments)
+        """Benachrichtigung einreihen, der Versand läuft im Hintergrund"""
+        self.dispatcher.submit(apartments)
+
+    def close(self):
+        """Ausstehende Benachrichtigungen zustellen und Verbindungen schließen
+
+        Nur was tatsächlich gebaut wurde, wird geschlossen.
+        """
+        dispatcher = self._built('dispatcher')
+        if dispatcher is not None:
+            dispatcher.stop()
+        for name in ('channels', 'notifier', 'enricher', 'duplicate_index'):
+            component = self._built(name)
+            if component is not None:
+                component.close()
+
+    def build_jobs(self):
+        """(Stadt, Portal)-Jobs für alle aktivierten Portale erzeugen"""
+        return [FetchJob(city, scraper)
+                for city in self.config["search_criteria"]["cities"]
+                for scraper in self.scrapers]
+
+    def on_price_change(self, apartment, previous):
+        """Preisänderung einer bekannten Anzeige (inkrementeller Modus der Scraper)"""
+        logger.info(f"Preis geändert: {apartment.title} ({apartment.source}): {previous.price} -> {apartment.price}")
+        self.price_changes.append((apartment, previous))
+
+    def mark_delivered(self, apartments):
+        """Nach erfolgreicher Zustellung als gesehen speichern"""
+        self.seen_apartments.add_many(apartment.get_hash() for apartment in apartments)
+        self.save_seen_apartments()
+
+    def is_known(self, apartment):
+        """Gesehen, im laufenden Durchlauf schon erfasst oder noch in der Outbox"""
+        apartment_hash = apartment.get_hash()
+        return (apartment_hash in self.seen_apartments
+                or apartment_hash in self.in_flight
+                or self.dispatcher.is_pending(apartment.canonical_id))
+
+    def unseeded_feeds(self):
+        """(Stadt, Portal)-Feeds, die nach Übernahme einer alten seen_apartments.json noch nicht befüllt sind
+
+        Die alten Hashes passen nicht zu den kanonischen IDs. Statt alle noch
+        online stehenden Anzeigen erneut zu melden, speichert der erste
+        erfolgreiche Lauf jedes Feeds seine Ergebnisse nur als gesehen.
+        Fertige Feeds stehen in SEEDING_PROGRESS_FILE.
+        """
+        if not os.path.exists(f"{LEGACY_SEEN_FILE}.migrated"):
+            return set()
+        seeded = set()
+        if os.path.exists(SEEDING_PROGRESS_FILE):
+            with open(SEEDING_PROGRESS_FILE, 'r', encoding='utf-8') as f:
+                seeded = {tuple(key) for key in json.load(f)}
+        return {job.key for job in self.build_jobs()} - seeded
+
+    def record_seeding(self, keys):
+        """Feeds als befüllt festhalten; sind alle befüllt, wird die Markierung zurückgezogen"""
+        if not keys:
+            return
+        remaining = self.unseeded_feeds() - set(keys)
+        if not remaining:
+            os.rename(f"{LEGACY_SEEN_FILE}.migrated", f"{LEGACY_SEEN_FILE}.seeded")
+            if os.path.exists(SEEDING_PROGRESS_FILE):
+                os.remove(SEEDING_PROGRESS_FILE)
+            logger.info("Erstbefüllung mit kanonischen IDs für alle Feeds abgeschlossen")
+            return
+        seeded = {job.key for job in self.build_jobs()} - remaining
+        tmp_path = f"{SEEDING_PROGRESS_FILE}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(sorted(list(key) for key in seeded), f, ensure_ascii=False)
+        os.replace(tmp_path, SEEDING_PROGRESS_FILE)
+
+    def is_seen(self, apartment):
+        seen = self.is_known(apartment)
+        if seen and self.history is not None:
+            self.observed_known.append(apartment)
+        return seen
+
+    def iter_apartments(self):
+        """Wohnungen aller Jobs streamen, sobald sie geparst sind"""
+        for job, apartment in self.fetch_engine.stream(self.build_jobs(), self.is_seen):
+            if apartment is not None:
+                yield apartment
 
     def scrape_all_sites(self):
-        """Alle Seiten scrapen"""
-        all_apartments = []
-        cities = self.config["search_criteria"]["cities"]
-        
-        for city in cities:
-            logger.info(f"Scrape {city}...")
-            
-            # ImmobilienScout24
-            apartments = self.scrape_immobilienscout24(city)
-            all_apartments.extend(apartments)
-            time.sleep(2)  # Pause zwischen Anfragen
-            
-            # WG-Gesucht
-            apartments = self.scrape_wg_gesucht(city)
-            all_apartments.extend(apartments)
-            time.sleep(2)
-            
-            # eBay Kleinanzeigen
-            apartments = self.scrape_ebay_kleinanzeigen(city)
-            all_apartments.extend(apartments)
-            time.sleep(2)
-        
-        return all_apartments
+        """Alle Seiten parallel scrapen, Pausen werden pro Domain eingehalten"""
+        return list(self.iter_apartments())
     
+    def iter_new_apartments(self, apartments):
+        """Nur neue Wohnungen durchreichen, konsumiert den Stream schrittweise"""
+        for apartment in apartments:
+            if not self.is_known(apartment):
+                self.in_flight.add(apartment.get_hash())
+                logger.info(f"Neue Wohnung: {apartment.title} ({apartment.source})")
+                yield apartment
+
     def filter_new_apartments(self, apartments):
         """Nur neue Wohnungen filtern"""
+        return list(self.iter_new_apartments(apartments))
+    
+    def filter_matching_apartments(self, apartments):
+        """Suchkriterien auf die Charge anwenden und Ablehnungen pro Regel loggen
+
+        Mit aktiver Anreicherung werden Detailseiten nur für Wohnungen geladen,
+        die Preis, Zimmer und Ausschlüsse schon bestanden haben.
+        """
+        if self.enricher is not None:
+            with metrics.timer("scraper_stage_seconds", stage="filter", city="*", portal="*"):
+                candidates = self.criteria_filter.filter(apartments, require_keywords=False)
+            with metrics.timer("scraper_stage_seconds", stage="enrich", city="*", portal="*"):
+                apartments = self.enricher.enrich(candidates)
+        with metrics.timer("scraper_stage_seconds", stage="filter", city="*", portal="*"):
+            matching = self.criteria_filter.filter(apartments)
+        rejections = self.criteria_filter.reset_stats()
+        if rejections:
+            summary = ", ".join(f"{rule}: {count}" for rule, count in sorted(rejections.items()))
+            logger.info(f"Abgelehnt nach Kriterien: {summary}")
+        if self.duplicate_index is not None:
+            # Cross-Posts erst nach dem Filter suchen, so wird nur ein Bruchteil signiert
+            with metrics.timer("scraper_stage_seconds", stage="dedup", city="*", portal="*"):
+                matching = self.duplicate_index.drop_duplicates(matching, logger)
+        return matching
+    
+    def run_jobs(self, jobs):
+        """Durchlauf für die gegebenen Jobs; liefert (passende neue Wohnungen, neue Wohnungen pro Job)
+
+        Jeder fertige Job wird mit seinen Wohnungen im Journal festgehalten.
+        Nach einem Abbruch werden diese Jobs nicht erneut geladen, sondern aus
+        dem Journal weiterverarbeitet. Als gesehen gelten neue Wohnungen erst,
+        wenn sie abgelehnt oder zugestellt wurden; bis dahin schützen Outbox
+        und `in_flight` vor doppelten Benachrichtigungen.
+        """
         new_apartments = []
+        new_per_job = Counter()
+        first_seen = []
+        # is_seen läuft in den Worker-Threads, den Zustand vorher im Hauptthread laden
+        for name in ('seen_apartments', 'history', 'dispatcher', 'journal'):
+            getattr(self, name)
+        unseeded = self.unseeded_feeds()
+        seeded_now = set()
+        seed_only = []
         
-        for apartment in apartments:
-            apartment_hash = apartment.get_hash()
-            if apartment_hash not in self.seen_apartments:
-                new_apartments.append(apartment)
-                self.seen_apartments.add(apartment_hash)
+        # Nach einem Abbruch zählt nur das Journal, nicht der Zustand im Speicher
+        self.in_flight.clear()
+        finished = self.journal.resume()
+        resumed = self.journal.cycle is not None
+        if not resumed:
+            self.journal.begin([job.key for job in jobs])
+        for key, apartments in finished.items():
+            first_seen.extend(apartments)
+            fresh = self.filter_new_apartments(apartments)
+            new_per_job[key] += len(fresh)
+            (seed_only if key in unseeded else new_apartments).extend(fresh)
         
-        return new_apartments
-    
-    def run_once(self):
-        """Einmaligen Scraping-Durchlauf ausführen"""
-        logger.info("Starte Scraping-Durchlauf...")
+        collected = {}
+        remaining = [job for job in jobs if job.key not in finished]
+        for job in remaining:
+            # Abgebrochene Jobs: der Cache kennt ihre Seiten schon, ihre Wohnungen stehen aber nicht im Journal.
+            # Zu befüllende Feeds: eine unveränderte Seite würde sonst nichts als gesehen speichern.
+            if resumed or job.key in unseeded:
+                job.scraper.forget_cached_pages(job.city)
+        for job, apartment in self.fetch_engine.stream(remaining, self.is_seen, self.on_price_change):
+            if apartment is None:
+                self.journal.checkpoint(job.key, collected.pop(job.key, []))
+                if job.key in unseeded and job.city not in job.scraper.failures:
+                    seeded_now.add(job.key)
+                continue
+            collected.setdefault(job.key, []).append(apartment)
+            first_seen.append(apartment)
+            with metrics.timer("scraper_stage_seconds", stage="dedup", city=job.city, portal=job.scraper.source):
+                fresh = self.filter_new_apartments([apartment])
+            new_per_job[job.key] += len(fresh)
+            (seed_only if job.key in unseeded else new_apartments).extend(fresh)
+        if seed_only:
+            logger.info(f"Erstbefüllung mit kanonischen IDs: {len(seed_only)} Wohnungen "
+                        f"als gesehen übernommen, ohne Benachrichtigung")
+        new_apartments = self.filter_matching_apartments(new_apartments)
+        
+        # Erst in die Outbox, dann alles Übrige als gesehen speichern, dann abschließen
+        self.send_email_notification(new_apartments)
+        matched = {apt.get_hash() for apt in new_apartments}
+        self.seen_apartments.add_many(h for h in self.in_flight if h not in matched)
+        self.save_seen_apartments()
+        self.journal.commit()
+        self.in_flight.clear()
+        self.record_seeding(seeded_now)
         
-        all_apartments = self.scrape_all_sites()
-        new_apartments = self.filter_new_apartments(all_apartments)
+        price_changes, self.price_changes = self.price_changes, []
+        if price_changes:
+            logger.info(f"{len(price_changes)} Preisänderungen bei bekannten Anzeigen")
+        
+        if self.history is not None:
+            observed_known, self.observed_known = self.observed_known, []
+            self.history.append(first_seen + observed_known, [apt.canonical_id for apt in first_seen])
+            self.history.compact()
         
         if new_apartments:
             logger.info(f"{len(new_apartments)} neue Wohnungen gefunden!")
             
-            # Benachrichtigungen senden
-            self.send_email_notification(new_apartments)
-            
-            # Gesehene Wohnungen speichern
-            self.save_seen_apartments()
-            
-            # Neue Wohnungen in JSON speichern
-            with open(f'new_apartments_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json', 'w', encoding='utf-8') as f:
-                json.dump([apt.to_dict() for apt in new_apartments], f, indent=2, ensure_ascii=False)
+            if self.history is None:
+                # Ohne pyarrow wie bisher als JSON ablegen
+                with open(f'new_apartments_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json', 'w', encoding='utf-8') as f:
+                    json.dump([apt.to_dict() for apt in new_apartments], f, indent=2, ensure_ascii=False)
         else:
             logger.info("Keine neuen Wohnungen gefunden.")
         
+        metrics_file = self.config.get("metrics", {}).get("file")
+        if metrics_file:
+            metrics.write_file(metrics_file)
+        
+        return new_apartments, new_per_job
+    
+    def run_once(self, profile_output=None):
+        """Einmaligen Scraping-Durchlauf ausführen, optional mit Profil (.prof für cProfile, .html für pyinstrument)"""
+        logger.info("Starte Scraping-Durchlauf...")
+        profile_output = profile_output or self.config.get("metrics", {}).get("profile_output")
+        if profile_output:
+            with profile(profile_output, logger):
+                new_apartments, _ = self.run_jobs(self.build_jobs())
+        else:
+            new_apartments, _ = self.run_jobs(self.build_jobs())
         return new_apartments
     
     def run_continuous(self):
-        """Kontinuierliches Scraping"""
-        interval = self.config["scraping"]["interval_minutes"]
-        logger.info(f"Starte kontinuierliches Scraping (Intervall: {interval} Minuten)")
-        
-        while True:
-            try:
-                self.run_once()
-                logger.info(f"Warte {interval} Minuten bis zum nächsten Durchlauf...")
-                time.sleep(interval * 60)
-            except KeyboardInterrupt:
-                logger.info("Scraping gestoppt.")
-                break
-            except Exception as e:
-                logger.error(f"Unerwarteter Fehler: {e}")
-                time.sleep(60)  # 1 Minute warten bei Fehlern
+        """Kontinuierliches Scraping, jeder Feed im eigenen, adaptiven Takt"""
+        from scheduler import run_scheduled
+        logger.info("Starte kontinuierliches Scraping mit adaptivem Intervall")
+        run_scheduled(self.build_jobs(), self.config, self.run_jobs, logger)
+        logger.info("Scraping gestoppt.")
+        self.close()
 
-def main():
-    """Hauptfunktion"""
-    scraper = ApartmentScraper()
+def print_apartments(apartments):
+    print(f"\n✅ {len(apartments)} neue Wohnungen gefunden!")
+    
+    for i, apt in enumerate(apartments, 1):
+        print(f"\n{i}. {apt.title}")
+        print(f"   💰 {apt.price} | 📍 {apt.location}")
+        print(f"   🔗 {apt.url}")
+
+def print_stats(history, days=None, portal=None):
+    """Auswertungen der Historie als Tabellen ausgeben"""
+    from datetime import timedelta, timezone
+    since = datetime.now(timezone.utc) - timedelta(days=days) if days else None
     
+    print("\nPreis pro m² (neue Anzeigen)")
+    print(f"{'Tag':<12}{'Portal':<22}{'Mittel':>10}{'Median':>10}{'Anzahl':>8}")
+    for row in history.price_per_sqm_trend(since, portal):
+        print(f"{row['day']:<12}{row['source']:<22}{row['price_per_sqm_mean']:>10.2f}"
+              f"{row['price_per_sqm_approximate_median']:>10.2f}{row['price_per_sqm_count']:>8}")
+    
+    print("\nZeit am Markt (Tage, Untergrenze)")
+    print(f"{'Portal':<22}{'Mittel':>10}{'Median':>10}{'Max':>10}{'Anzeigen':>10}")
+    for row in history.time_on_market(since, portal):
+        print(f"{row['source']:<22}{row['days_mean']:>10.1f}{row['days_approximate_median']:>10.1f}"
+              f"{row['days_max']:>10.1f}{row['canonical_id_count']:>10}")
+    
+    print("\nNeue Anzeigen pro Tag")
+    print(f"{'Tag':<12}{'Portal':<22}{'Anzahl':>8}")
+    for row in history.portal_volume(since, portal):
+        print(f"{row['day']:<12}{row['source']:<22}{row['canonical_id_count_distinct']:>8}")
+
+def replay_config(config, directory, record=False):
+    """Konfiguration für `replay`: aller Zustand in einem Scratch-Verzeichnis, keine echten Benachrichtigungen
+
+    Liefert (Konfiguration, Scratch-Verzeichnis). Seen-Store, Cache, Historie,
+    Dubletten-Index, Journal, Outbox und Metriken des Live-Betriebs bleiben unberührt; Treffer
+    landen nur in notifications.txt im Scratch-Verzeichnis.
+    """
+    import copy
+    import tempfile
+    scratch = tempfile.mkdtemp(prefix='replay-')
+    config = copy.deepcopy(config)
+    config["replay"] = {"mode": "record" if record else "replay", "directory": os.path.abspath(directory)}
+    config.setdefault("storage", {}).update({
+        "seen_path": os.path.join(scratch, 'seen_apartments.db'),
+        "journal_path": os.path.join(scratch, 'cycle_journal.jsonl'),
+    })
+    config.setdefault("cache", {})["path"] = os.path.join(scratch, 'response_cache.db')
+    config.setdefault("history", {})["path"] = os.path.join(scratch, 'history')
+    config.setdefault("enrichment", {})["cache_path"] = os.path.join(scratch, 'detail_cache.db')
+    config.setdefault("dedup", {})["path"] = os.path.join(scratch, 'duplicate_index.db')
+    config.setdefault("metrics", {})["file"] = os.path.join(scratch, 'metrics.prom')
+    notification = config.setdefault("notification", {})
+    for channel in ("email", "webhook", "telegram"):
+        notification.setdefault(channel, {})["enabled"] = False
+    notification["file"] = {"enabled": True, "path": os.path.join(scratch, 'notifications.txt')}
+    notification.setdefault("dispatch", {})["outbox_path"] = os.path.join(scratch, 'undelivered_notifications.jsonl')
+    return config, scratch
+
+def interactive_menu(scraper):
     print("🏠 Wohnungs-Scraper")
     print("=" * 40)
     print("1. Einmaligen Durchlauf starten")
@@ -255,12 +638,8 @@ def main():
     
     if choice == "1":
         apartments = scraper.run_once()
-        print(f"\n✅ {len(apartments)} neue Wohnungen gefunden!")
-        
-        for i, apt in enumerate(apartments, 1):
-            print(f"\n{i}. {apt.title}")
-            print(f"   💰 {apt.price} | 📍 {apt.location}")
-            print(f"   🔗 {apt.url}")
+        scraper.close()
+        print_apartments(apartments)
     
     elif choice == "2":
         scraper.run_continuous()
@@ -272,5 +651,57 @@ def main():
     else:
         print("Ungültige Auswahl.")
 
+def build_parser():
+    parser = argparse.ArgumentParser(description="Wohnungs-Scraper; ohne Befehl startet das interaktive Menü")
+    parser.add_argument('--config', default='scraper_config.json', help="Konfigurationsdatei")
+    commands = parser.add_subparsers(dest='command')
+    
+    once = commands.add_parser('once', help="Einen Durchlauf ausführen (z.B. per Cron)")
+    once.add_argument('--profile', metavar='DATEI', help="Profil schreiben (.prof für cProfile, .html für pyinstrument)")
+    
+    commands.add_parser('daemon', help="Kontinuierlich mit adaptivem Intervall scrapen")
+    
+    replay = commands.add_parser('replay', help="Einen Durchlauf gegen aufgezeichnete Antworten ausführen")
+    replay.add_argument('directory', help="Verzeichnis der Aufzeichnung")
+    replay.add_argument('--record', action='store_true', help="Live abrufen und dabei aufzeichnen")
+    
+    stats = commands.add_parser('stats', help="Auswertungen der Historie anzeigen")
+    stats.add_argument('--days', type=int, help="Nur die letzten N Tage")
+    stats.add_argument('--portal', help="Nur dieses Portal, z.B. WG-Gesucht")
+    return parser
+
+def main(argv=None):
+    """Hauptfunktion"""
+    args = build_parser().parse_args(argv)
+    scraper = ApartmentScraper(args.config)
+    
+    if args.command is None:
+        interactive_menu(scraper)
+    
+    elif args.command == 'once':
+        apartments = scraper.run_once(args.profile)
+        scraper.close()
+        print_apartments(apartments)
+    
+    elif args.command == 'daemon':
+        scraper.run_continuous()
+    
+    elif args.command == 'replay':
+        scraper.config, scratch = replay_config(scraper.config, args.directory, args.record)
+        # Alte seen_apartments.json und new_apartments_*.json im Arbeitsverzeichnis nicht anfassen
+        os.chdir(scratch)
+        logger.info(f"Replay-Zustand in {scratch}")
+        apartments = scraper.run_once()
+        scraper.close()
+        print_apartments(apartments)
+    
+    elif args.command == 'stats':
+        if scraper.history is None:
+            print("Keine Historie verfügbar (history.enabled oder pyarrow prüfen).")
+            return 1
+        print_stats(scraper.history, args.days, args.portal)
+    
+    return 0
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    raise SystemExit(main())
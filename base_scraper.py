@@ -0,0 +1,199 @@
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from extraction import ListingExtractor
+from metrics import job_labels, registry
+from response_cache import cache_key, fetch_page
+
+_ROOMS_IN_TEXT = re.compile(r'(\d+(?:[.,]5)?)\s*-?\s*(?:Zimmer|Zi\.)', re.IGNORECASE)
+_SIZE_IN_TEXT = re.compile(r'(\d+(?:[.,]\d+)?)\s*(?:m²|qm|m2)', re.IGNORECASE)
+
+class BaseScraper:
+    """Gemeinsamer Ablauf: Ergebnisseiten nacheinander laden und Wohnungen streamen
+
+    Portale setzen `domain`, `source`, `selectors`, `listing_id_pattern` und
+    implementieren `page_url` sowie `build_apartment`. Mit `detail_selectors`
+    lassen sich Zimmer, Größe und Beschreibung von der Detailseite nachladen.
+
+    Im inkrementellen Modus wird jede Karte über ihr rohes HTML erkannt:
+    unveränderte Karten liefern das Apartment aus dem letzten Durchlauf ohne
+    erneute Extraktion, geänderte Karten mit anderem Preis lösen `on_change` aus.
+
+    `failures` enthält die Städte, deren letzter Abruf fehlgeschlagen ist.
+    """
+    domain = None
+    source = None
+    selectors = None
+    detail_selectors = None
+    listing_id_pattern = None
+    card_key_field = 'link'
+
+    def __init__(self, config, session, logger=None, cache=None):
+        self.config = config
+        self.session = session
+        self.logger = logger or logging.getLogger(__name__)
+        self.cache = cache
+        self.extractor = ListingExtractor(self.selectors)
+        self.detail_extractor = ListingExtractor(self.detail_selectors) if self.detail_selectors else None
+        incremental = config.get("scraping", {}).get("incremental", {})
+        self.incremental = incremental.get("enabled", True)
+        self.max_fingerprints = incremental.get("max_fingerprints", 5000)
+        # Kartenschlüssel -> (HTML-Digest, Apartment), älteste zuerst
+        self.fingerprints = OrderedDict()
+        self._fingerprint_lock = threading.Lock()
+        self.failures = set()
+
+    def page_url(self, city, page):
+        """URL und Parameter der Ergebnisseite `page` (ab 1)"""
+        raise NotImplementedError
+
+    def query_key(self, city):
+        """Identität der Abfrage: gleiche Schlüssel liefern dieselben Ergebnisseiten"""
+        from requests import Request
+        url, params = self.page_url(city, 1)
+        return Request('GET', url, params=params).prepare().url
+
+    def forget_cached_pages(self, city):
+        """Cache-Einträge der Ergebnisseiten verwerfen, damit sie wieder geparst werden"""
+        if self.cache is None:
+            return
+        for page in range(1, self.config["scraping"].get("max_pages_per_site", 10) + 1):
+            self.cache.forget(cache_key(*self.page_url(city, page)))
+
+    def listing_id(self, url):
+        """Portal-eigene Anzeigen-ID aus der URL"""
+        if self.listing_id_pattern:
+            match = re.search(self.listing_id_pattern, url)
+            if match:
+                return match.group(1)
+        return ""
+
+    def build_apartment(self, fields, city):
+        """Apartment aus den extrahierten Feldern bauen, None zum Überspringen"""
+        raise NotImplementedError
+
+    def parse_detail(self, content):
+        """Felder der Detailseite; Zimmer und Größe notfalls aus dem Beschreibungstext"""
+        cards = self.detail_extractor.cards(content)
+        if not cards:
+            return {}
+        details = {name: value for name, value in self.detail_extractor.extract(cards[0]).items() if value}
+        text = details.get('description', '')
+        if 'rooms' not in details:
+            match = _ROOMS_IN_TEXT.search(text)
+            if match:
+                details['rooms'] = match.group(1)
+        if 'size' not in details:
+            match = _SIZE_IN_TEXT.search(text)
+            if match:
+                details['size'] = f"{match.group(1)} m²"
+        return details
+
+    def fetch_details(self, apartment):
+        """Detailseite einer Wohnung laden und parsen"""
+        response = self.session.get(apartment.url)
+        if response.status_code != 200:
+            raise RuntimeError(f"Statuscode {response.status_code} für {apartment.url}")
+        return self.parse_detail(response.content)
+
+    def _lookup_card(self, key):
+        with self._fingerprint_lock:
+            entry = self.fingerprints.get(key)
+            if entry is not None:
+                self.fingerprints.move_to_end(key)
+            return entry
+
+    def _remember_card(self, key, digest, apartment):
+        with self._fingerprint_lock:
+            self.fingerprints[key] = (digest, apartment)
+            self.fingerprints.move_to_end(key)
+            while len(self.fingerprints) > self.max_fingerprints:
+                self.fingerprints.popitem(last=False)
+
+    def scrape(self, city, is_seen=None, on_change=None):
+        """Generator über alle Wohnungen, neueste zuerst
+
+        Bricht ab, sobald `stop_after_seen` bereits bekannte Anzeigen in Folge
+        kommen, da die Portale nach Datum sortieren. `on_change(apartment,
+        previous)` wird für Karten mit geändertem Preis aufgerufen.
+        """
+        self.logger.info(f"{self.source} scrapen")
+        scraping = self.config["scraping"]
+        max_results = scraping["max_results_per_site"]
+        max_pages = scraping.get("max_pages_per_site", 10)
+        stop_after_seen = scraping.get("stop_after_seen", 3)
+        yielded = 0
+        seen_in_row = 0
+        self.failures.discard(city)
+        try:
+            for page in range(1, max_pages + 1):
+                url, params = self.page_url(city, page)
+                response, changed = fetch_page(self.session, self.cache, url, params)
+                if not changed:
+                    self.logger.info(f"{self.source} Seite {page} unverändert seit dem letzten Durchlauf.")
+                    return
+                if response.status_code == 404 and page > 1:
+                    return
+                if response.status_code != 200:
+                    self.logger.error(f"Fehler beim Abrufen von {self.source}: Statuscode {response.status_code}")
+                    self.failures.add(city)
+                    return
+                parse_started = time.perf_counter()
+                listings = self.extractor.cards(response.content)
+                parse_seconds = time.perf_counter() - parse_started
+                self.logger.info(f"{self.source} Seite {page}: {len(listings)} Anzeigen gefunden.")
+                try:
+                    if not listings:
+                        if page == 1:
+                            registry.inc("scraper_empty_pages_total", portal=self.source)
+                        return
+                    for listing in listings:
+                        parse_started = time.perf_counter()
+                        key = digest = None
+                        try:
+                            if self.incremental:
+                                key = self.extractor.field(listing, self.card_key_field) or None
+                                digest = self.extractor.fingerprint(listing)
+                            entry = self._lookup_card(key) if key else None
+                            if entry is not None and entry[0] == digest:
+                                # Unveränderte Karte: Apartment aus dem letzten Durchlauf
+                                registry.inc("scraper_cards_unchanged_total", portal=self.source)
+                                apartment, previous, key = entry[1], None, None
+                            else:
+                                previous = entry[1] if entry else None
+                                apartment = self.build_apartment(self.extractor.extract(listing), city)
+                        except Exception as e:
+                            registry.inc("scraper_parse_failures_total", portal=self.source)
+                            self.logger.error(f"Fehler beim Parsen eines {self.source} Listings: {e}")
+                            continue
+                        finally:
+                            parse_seconds += time.perf_counter() - parse_started
+                        if apartment is None:
+                            continue
+                        if not apartment.listing_id:
+                            apartment.listing_id = self.listing_id(apartment.url)
+                        if key is not None:
+                            self._remember_card(key, digest, apartment)
+                            if previous is not None and apartment.price != previous.price:
+                                registry.inc("scraper_price_changes_total", portal=self.source)
+                                if on_change is not None:
+                                    on_change(apartment, previous)
+                        if is_seen is not None and is_seen(apartment):
+                            seen_in_row += 1
+                            if seen_in_row >= stop_after_seen:
+                                self.logger.info(f"{self.source}: bekannte Anzeigen erreicht, breche ab.")
+                                return
+                            continue
+                        seen_in_row = 0
+                        yield apartment
+                        yielded += 1
+                        if yielded >= max_results:
+                            return
+                finally:
+                    # Nur Parse-Zeit, nicht die Zeit beim Konsumenten zwischen den yields
+                    registry.observe("scraper_stage_seconds", parse_seconds, stage="parse", **job_labels())
+        except Exception as e:
+            self.logger.error(f"Fehler beim Scrapen von {self.source}: {e}")
+            self.failures.add(city)
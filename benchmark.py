@@ -0,0 +1,280 @@
+"""Benchmarks gegen gespeicherte Fixture-Seiten, komplett ohne Netzwerk
+
+Aufruf: python benchmark.py [parsers|e2e] [--sizes 20 200 2000] [--repeat 5]
+
+`parsers` misst Latenz und Speicher der Extraktion je Portal, `e2e` einen
+vollständigen `run_once` über synthetische Aufzeichnungen (siehe replay.py).
+"""
+import argparse
+import copy
+import json
+import multiprocessing
+import os
+import random
+import re
+import resource
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+import requests
+
+import replay
+from ebay_kleinanzeigen_scraper import EbayKleinanzeigenScraper
+from extraction import ListingExtractor, css_to_xpath
+from immobilienscout24_scraper import Immobilienscout24Scraper
+from wg_gesucht_scraper import WgGesuchtScraper
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+PORTALS = {
+    'immobilienscout24': Immobilienscout24Scraper,
+    'wg_gesucht': WgGesuchtScraper,
+    'ebay_kleinanzeigen': EbayKleinanzeigenScraper,
+}
+
+
+def load_fixture(portal):
+    with open(os.path.join(FIXTURE_DIR, f'{portal}.html'), 'rb') as f:
+        return f.read()
+
+
+_TITLE_WORDS = ('Helle', 'Ruhige', 'Sanierte', 'Große', 'Moderne', 'Gemütliche', 'Zentrale',
+                'Wohnung', 'Maisonette', 'Altbau', 'Balkon', 'Garten', 'Einbauküche', 'Dachgeschoss',
+                'Stellplatz', 'Haustiere', 'erlaubt', 'Nähe', 'Bahnhof', 'Park', 'Innenstadt')
+_LISTING_ID = re.compile(r'\d{6,}')
+
+
+def _vary_card(card, selectors, index, rng):
+    """Karte zu einem eigenständigen Listing machen: eigene ID, eigener Titel und Preis"""
+    from lxml import etree
+    for name, spec in selectors['fields'].items():
+        selector, attribute = spec if isinstance(spec, (tuple, list)) else (spec, None)
+        found = etree.XPath(f"({css_to_xpath(selector)})[1]")(card)
+        if not found:
+            continue
+        element = found[0]
+        if attribute:
+            element.set(attribute, _LISTING_ID.sub(str(900000000 + index), element.get(attribute, ''), count=1))
+            continue
+        text_node = next((e for e in element.iter() if e.text and e.text.strip()), None)
+        if text_node is None:
+            continue
+        if name == 'title':
+            text_node.text = ' '.join(rng.sample(_TITLE_WORDS, 6)) + f' {index}'
+        elif name == 'price':
+            text_node.text = f"{rng.randrange(400, 1600)} €"
+
+
+def scale_page(content, selectors, count, unique=False):
+    """Fixture-Seite auf `count` Karten vervielfältigen
+
+    Mit `unique` bekommt jede Karte eine eigene ID, Titel und Preis, damit
+    Seen-Store und Dublettenerkennung sie als neue Wohnungen behandeln.
+    """
+    from lxml import html
+    extractor = ListingExtractor(selectors)
+    root = extractor.parse(content)
+    cards = extractor._card_xpath(root)
+    parent = cards[0].getparent()
+    for i in range(count - len(cards)):
+        parent.append(copy.deepcopy(cards[i % len(cards)]))
+    if unique:
+        rng = random.Random(count)
+        for i, card in enumerate(extractor._card_xpath(root)):
+            _vary_card(card, selectors, i, rng)
+    return html.tostring(root, encoding='utf-8')
+
+
+def extract_legacy(content, selectors):
+    """Bisheriger Weg: html.parser-Baum mit find_all/find pro Karte"""
+    from bs4 import BeautifulSoup
+
+    def split(selector):
+        tag, _, cls = selector.partition('.')
+        return (tag or None), ({'class_': cls} if cls else {})
+
+    soup = BeautifulSoup(content, 'html.parser')
+    tag, kwargs = split(selectors['card'])
+    results = []
+    for card in soup.find_all(tag, **kwargs):
+        fields = {}
+        for name, spec in selectors['fields'].items():
+            selector, attribute = spec if isinstance(spec, (tuple, list)) else (spec, None)
+            tag, kwargs = split(selector)
+            elem = card.find(tag, **kwargs)
+            if elem is None:
+                fields[name] = ''
+            elif attribute:
+                fields[name] = elem.get(attribute) or ''
+            else:
+                fields[name] = elem.text.strip()
+        results.append(fields)
+    return results
+
+
+def extract_fast(content, selectors):
+    return list(ListingExtractor(selectors).iter_listings(content))
+
+
+def _peak_rss_worker(func, warmup, content, selectors, queue):
+    # Imports und Parser-Initialisierung nicht mitmessen
+    func(warmup, selectors)
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    func(content, selectors)
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put(after - before)
+
+
+def peak_memory_kb(func, warmup, content, selectors):
+    """Zusätzlicher Spitzen-RSS in KB, gemessen in einem frischen Prozess"""
+    context = multiprocessing.get_context('fork')
+    queue = context.Queue()
+    process = context.Process(target=_peak_rss_worker, args=(func, warmup, content, selectors, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def traced_peak_kb(func, content, selectors):
+    """Spitze der Python-Allokationen in KB (tracemalloc, ohne lxml-interne C-Puffer)"""
+    tracemalloc.start()
+    try:
+        func(content, selectors)
+        return tracemalloc.get_traced_memory()[1] // 1024
+    finally:
+        tracemalloc.stop()
+
+
+def time_ms(func, content, selectors, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(content, selectors)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def run(sizes, repeat, include_legacy=True):
+    print(f"{'Portal':<20}{'Karten':>8}{'Verfahren':>10}{'ms (Median)':>14}{'Peak-RSS KB':>14}{'tracemalloc KB':>16}")
+    for portal, scraper_cls in PORTALS.items():
+        selectors = scraper_cls.selectors
+        fixture = load_fixture(portal)
+        for size in sizes:
+            content = scale_page(fixture, selectors, size)
+            methods = [('lxml', extract_fast)]
+            if include_legacy:
+                methods.insert(0, ('bs4', extract_legacy))
+            for label, func in methods:
+                ms = time_ms(func, content, selectors, repeat)
+                rss = peak_memory_kb(func, fixture, content, selectors)
+                traced = traced_peak_kb(func, content, selectors)
+                print(f"{portal:<20}{size:>8}{label:>10}{ms:>14.2f}{rss:>14}{traced:>16}")
+
+
+def build_recording(directory, config, city, size):
+    """Für jedes Portal eine erste Ergebnisseite mit `size` Listings aufzeichnen
+
+    Folgeseiten fehlen in der Aufzeichnung und liefern beim Abspielen 404,
+    womit die Paginierung endet.
+    """
+    store = replay.RecordingStore(directory)
+    for portal, scraper_cls in PORTALS.items():
+        scraper = scraper_cls(config, session=None)
+        url, params = scraper.page_url(city, 1)
+        prepared = requests.Request('GET', url, params=params).prepare()
+        content = scale_page(load_fixture(portal), scraper_cls.selectors, size, unique=True)
+        store.put('GET', prepared.url, 200, {'Content-Type': 'text/html; charset=utf-8'}, content)
+    return store
+
+
+def benchmark_config(workdir, size):
+    """Standard-Konfiguration ohne Drosselung, Cache und echte Benachrichtigungen"""
+    from apartment_scraper import ApartmentScraper
+    config = ApartmentScraper.load_config(None, os.path.join(workdir, 'defaults.json'))
+    config['notification']['email']['enabled'] = False
+    config['scraping'].update({
+        'max_results_per_site': size,
+        'max_pages_per_site': 2,
+        'min_domain_interval_seconds': 0,
+    })
+    config['rate_limit'].update({'requests_per_second': 1000, 'burst': 1000})
+    config['cache']['enabled'] = False
+    config['metrics']['file'] = None
+    config['replay'] = {'mode': 'replay', 'directory': os.path.join(workdir, 'recordings')}
+    return config
+
+
+def _end_to_end_once(size):
+    from apartment_scraper import ApartmentScraper
+    previous_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            config = benchmark_config(workdir, size)
+            config_path = os.path.join(workdir, 'scraper_config.json')
+            with open(config_path, 'w', encoding='utf-8') as f:
+                json.dump(config, f)
+            city = config['search_criteria']['cities'][0]
+            build_recording(config['replay']['directory'], config, city, size)
+
+            app = ApartmentScraper(config_path)
+            try:
+                tracemalloc.start()
+                before_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                start = time.perf_counter()
+                app.run_once()
+                seconds = time.perf_counter() - start
+                traced = tracemalloc.get_traced_memory()[1] // 1024
+                tracemalloc.stop()
+                rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before_rss
+            finally:
+                app.close()
+            # Passende Wohnungen gelten erst nach der Zustellung als gesehen, also nach close()
+            listings = len(app.seen_apartments)
+        finally:
+            os.chdir(previous_dir)
+    return seconds, listings, traced, rss
+
+
+def _end_to_end_worker(size, queue):
+    import logging
+    logging.disable(logging.INFO)
+    queue.put(_end_to_end_once(size))
+
+
+def run_end_to_end(sizes, repeat):
+    """Vollständige Durchläufe (Abruf, Parsing, Seen-Store, Dubletten, Filter) je Seitengröße"""
+    print(f"{'Listings/Portal':>16}{'Listings':>10}{'s (Median)':>12}{'Listings/s':>12}{'tracemalloc KB':>16}{'Peak-RSS KB':>14}")
+    context = multiprocessing.get_context('fork')
+    for size in sizes:
+        results = []
+        for _ in range(repeat):
+            # Jeder Durchlauf in einem frischen Prozess mit leerem Zustand
+            queue = context.Queue()
+            process = context.Process(target=_end_to_end_worker, args=(size, queue))
+            process.start()
+            results.append(queue.get())
+            process.join()
+        seconds = statistics.median(r[0] for r in results)
+        listings, traced, rss = results[-1][1:]
+        print(f"{size:>16}{listings:>10}{seconds:>12.3f}{listings / seconds:>12.0f}{traced:>16}{rss:>14}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline-Benchmarks für Extraktion und Durchläufe")
+    parser.add_argument('suite', nargs='?', choices=['parsers', 'e2e'], default='parsers')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[20, 200, 2000, 10000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--no-legacy', action='store_true', help="bs4-Vergleich überspringen")
+    args = parser.parse_args()
+    if args.suite == 'e2e':
+        run_end_to_end(args.sizes, args.repeat)
+    else:
+        run(args.sizes, args.repeat, include_legacy=not args.no_legacy)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+import re
+from bisect import bisect_right
+from collections import Counter
+
+# Trennzeichen zwischen den Texten einer Charge, kommt in Keywords nicht vor
+_SEPARATOR = '\x00'
+
+
+def _compile_keywords(keywords):
+    """Alle Keywords in einen einzigen Regex (längste zuerst) übersetzen"""
+    words = sorted({k.lower() for k in keywords if k}, key=len, reverse=True)
+    if not words:
+        return None
+    return re.compile('|'.join(re.escape(word) for word in words))
+
+
+class CriteriaFilter:
+    """Suchkriterien einmal kompilieren und auf ganze Chargen anwenden
+
+    Keywords werden zu je einem Regex zusammengefasst und in einem Durchlauf
+    über den verketteten Text aller Wohnungen gesucht, der Aufwand wächst also
+    mit der Textlänge und nicht mit Keywords x Wohnungen. Zahlen werden gegen
+    die beim Extrahieren geparsten Felder geprüft, unbekannte Werte passieren.
+    """
+
+    def __init__(self, criteria):
+        self.criteria = criteria
+        self.excluded = _compile_keywords(criteria.get("excluded_keywords", []))
+        self.included = _compile_keywords(criteria.get("keywords", []))
+        self.ranges = [
+            (rule, attribute, bound, check)
+            for rule, attribute, bound, check in (
+                ("max_price", "price_value", criteria.get("max_price"), lambda v, b: v <= b),
+                ("min_rooms", "rooms_value", criteria.get("min_rooms"), lambda v, b: v >= b),
+                ("max_rooms", "rooms_value", criteria.get("max_rooms"), lambda v, b: v <= b),
+                ("min_size", "size_value", criteria.get("min_size"), lambda v, b: v >= b),
+                ("max_size", "size_value", criteria.get("max_size"), lambda v, b: v <= b),
+            )
+            if bound is not None
+        ]
+        self.rejections = Counter()
+
+    @staticmethod
+    def _matching_indices(pattern, texts):
+        """Indizes der Texte, in denen `pattern` vorkommt, mit einem Scan über alle Texte"""
+        if pattern is None or not texts:
+            return set()
+        starts = []
+        offset = 0
+        for text in texts:
+            starts.append(offset)
+            offset += len(text) + 1
+        joined = _SEPARATOR.join(texts)
+        return {bisect_right(starts, match.start()) - 1 for match in pattern.finditer(joined)}
+
+    def filter(self, apartments, require_keywords=True):
+        """Wohnungen, die alle Kriterien erfüllen; Ablehnungen landen in `rejections`
+
+        Mit `require_keywords=False` werden nur Ausschlüsse geprüft, z.B. bevor
+        die Beschreibung nachgeladen ist.
+        """
+        apartments = list(apartments)
+        alive = [True] * len(apartments)
+
+        for rule, attribute, bound, check in self.ranges:
+            for i, apartment in enumerate(apartments):
+                if alive[i]:
+                    value = getattr(apartment, attribute)
+                    if value is not None and not check(value, bound):
+                        alive[i] = False
+                        self.rejections[rule] += 1
+
+        indices = [i for i, ok in enumerate(alive) if ok]
+        texts = [f"{apartments[i].title} {apartments[i].description}".lower() for i in indices]
+
+        for position in self._matching_indices(self.excluded, texts):
+            alive[indices[position]] = False
+            self.rejections["excluded_keyword"] += 1
+
+        if require_keywords and self.included is not None:
+            hits = self._matching_indices(self.included, texts)
+            for position, i in enumerate(indices):
+                if alive[i] and position not in hits:
+                    alive[i] = False
+                    self.rejections["missing_keyword"] += 1
+
+        return [apartment for apartment, ok in zip(apartments, alive) if ok]
+
+    def matches(self, apartment):
+        return bool(self.filter([apartment]))
+
+    def reset_stats(self):
+        stats = dict(self.rejections)
+        self.rejections.clear()
+        return stats
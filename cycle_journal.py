@@ -0,0 +1,76 @@
+import json
+import logging
+import os
+import time
+from apartment import Apartment
+
+
+class CycleJournal:
+    """Write-Ahead-Journal eines Durchlaufs als JSONL, jede Zeile per fsync gesichert
+
+    `begin` eröffnet einen Durchlauf, `checkpoint` hält jeden fertigen
+    (Stadt, Portal)-Job mit seinen Wohnungen fest, `commit` leert das Journal.
+    Bricht ein Durchlauf ab, liefert `resume` beim nächsten Start die bereits
+    fertigen Jobs, sodass sie nicht erneut geladen werden müssen.
+    """
+
+    def __init__(self, path='cycle_journal.jsonl', logger=None):
+        self.path = path
+        self.logger = logger or logging.getLogger(__name__)
+        self.cycle = None
+
+    def _append(self, record):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def resume(self):
+        """Fertige Jobs eines abgebrochenen Durchlaufs: {(Stadt, Portal): [Apartment]}"""
+        finished = {}
+        if not os.path.exists(self.path):
+            return finished
+        with open(self.path, 'r+b') as f:
+            good = 0
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("Zeilenende fehlt")
+                    record = json.loads(line)
+                except ValueError:
+                    # Beim Absturz halb geschriebene letzte Zeile abschneiden,
+                    # sonst landet der nächste Eintrag in derselben Zeile
+                    self.logger.warning(f"Unvollständiger Eintrag in {self.path} verworfen")
+                    f.truncate(good)
+                    f.flush()
+                    os.fsync(f.fileno())
+                    break
+                good += len(line)
+                if record["type"] == "begin":
+                    self.cycle = record["cycle"]
+                    finished = {}
+                elif record["type"] == "job":
+                    finished[tuple(record["key"])] = [Apartment.from_dict(data) for data in record["apartments"]]
+        if self.cycle is not None:
+            self.logger.info(f"Setze abgebrochenen Durchlauf {self.cycle} fort: {len(finished)} Jobs bereits fertig")
+        return finished
+
+    def begin(self, job_keys):
+        self.cycle = time.strftime('%Y%m%d_%H%M%S')
+        self._append({"type": "begin", "cycle": self.cycle, "jobs": [list(key) for key in job_keys]})
+
+    def checkpoint(self, job_key, apartments):
+        self._append({
+            "type": "job",
+            "key": list(job_key),
+            "apartments": [apartment.to_dict() for apartment in apartments],
+        })
+
+    def commit(self):
+        """Durchlauf abschließen: Journal atomar leeren"""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.cycle = None
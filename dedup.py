@@ -0,0 +1,235 @@
+import hashlib
+import re
+import sqlite3
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+_UMLAUTS = str.maketrans({'ä': 'ae', 'ö': 'oe', 'ü': 'ue', 'ß': 'ss'})
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+
+
+def normalize_text(text):
+    """Kleinschreibung, Umlaute auflösen, Satzzeichen entfernen"""
+    return _NON_WORD.sub(' ', (text or '').lower().translate(_UMLAUTS)).strip()
+
+
+def listing_fingerprint_text(apartment):
+    """Vergleichstext aus Titel, Größe und Adresse"""
+    size = '' if apartment.size in ("", "N/A") else apartment.size
+    return normalize_text(f"{apartment.title} {size} {apartment.location}")
+
+
+def shingles(text, k=4):
+    """Zeichen-k-Gramme eines normalisierten Textes"""
+    if len(text) <= k:
+        return {text} if text else set()
+    return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+
+class MinHasher:
+    """MinHash-Signaturen über Shingle-Mengen
+
+    Statt `num_perm` Permutationen einzeln in Python zu rechnen, liefert ein
+    SHAKE-128-Digest pro Shingle alle `num_perm` Hashwerte (je 32 Bit) auf
+    einmal; das Minimum je Position bilden `zip` und `min` in C.
+    """
+
+    def __init__(self, num_perm=64, seed=1):
+        self.num_perm = num_perm
+        self._salt = seed.to_bytes(8, 'big')
+        self._unpack = struct.Struct(f'>{num_perm}I').unpack
+
+    def signature(self, shingle_set):
+        if not shingle_set:
+            return (0,) * self.num_perm
+        digest_size = 4 * self.num_perm
+        hashes = [self._unpack(hashlib.shake_128(self._salt + s.encode()).digest(digest_size))
+                  for s in shingle_set]
+        return tuple(map(min, zip(*hashes)))
+
+
+def estimate_similarity(sig_a, sig_b):
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / len(sig_a)
+
+
+def values_compatible(a, b, tolerance):
+    """(Preis, Größe) passen zusammen, soweit beide bekannt sind; mindestens eines muss bekannt sein"""
+    known = [(x, y) for x, y in zip(a, b) if x is not None and y is not None]
+    return bool(known) and all(abs(x - y) <= tolerance * max(x, y) for x, y in known)
+
+
+class NearDuplicateIndex:
+    """LSH-Index über MinHash-Signaturen, findet Cross-Posts ohne paarweisen Vergleich
+
+    Die Signatur wird in `bands` Bänder zu je `rows` Werten zerlegt; nur
+    Einträge, die in mindestens einem Band übereinstimmen, werden verglichen.
+    Als Duplikat zählt nur ein Listing eines anderen Portals, dessen Preis und
+    Größe höchstens um `value_tolerance` abweichen; gleiche Titel auf demselben
+    Portal sind verschiedene Anzeigen. Der Index hält höchstens `max_entries`
+    Einträge (älteste fliegen zuerst).
+
+    Mit `path` werden die Signaturen zusätzlich in SQLite abgelegt und beim
+    Start wieder eingelesen, damit Cross-Posts auch über einzelne Läufe (Cron)
+    und Neustarts hinweg erkannt werden. `flush()` committet.
+    """
+
+    def __init__(self, threshold=0.7, bands=16, rows=4, max_entries=50000, value_tolerance=0.1, path=None):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = rows
+        self.max_entries = max_entries
+        self.value_tolerance = value_tolerance
+        self.hasher = MinHasher(num_perm=bands * rows)
+        # canonical_id -> (Signatur, Portal, Preis, Größe)
+        self._entries = OrderedDict()
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._signature_format = struct.Struct(f'>{bands * rows}I')
+        self._conn = None
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS signatures (
+                    canonical_id TEXT PRIMARY KEY,
+                    signature BLOB NOT NULL,
+                    source TEXT,
+                    price_value REAL,
+                    size_value REAL,
+                    added_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_signatures_added ON signatures (added_at)")
+            self._conn.commit()
+            self._load()
+
+    def _load(self):
+        """Die neuesten `max_entries` gespeicherten Signaturen in den Index übernehmen"""
+        rows = self._conn.execute(
+            "SELECT * FROM (SELECT canonical_id, signature, source, price_value, size_value, added_at"
+            " FROM signatures ORDER BY added_at DESC LIMIT ?) ORDER BY added_at",
+            (self.max_entries,),
+        ).fetchall()
+        if rows:
+            # Was nicht mehr in den Index passt, auch aus der Datei entfernen
+            self._conn.execute("DELETE FROM signatures WHERE added_at < ?", (rows[0][5],))
+            self._conn.commit()
+        for canonical_id, blob, source, price_value, size_value, _ in rows:
+            if len(blob) != self._signature_format.size:
+                # Mit anderer Band-Konfiguration gespeichert
+                continue
+            signature = self._signature_format.unpack(blob)
+            self._entries[canonical_id] = (signature, source, price_value, size_value)
+            for key in self._band_keys(signature):
+                self._buckets.setdefault(key, set()).add(canonical_id)
+
+    @classmethod
+    def from_config(cls, config):
+        """Index aus der Konfiguration, None wenn deaktiviert"""
+        settings = config.get("dedup", {})
+        if not settings.get("enabled", True):
+            return None
+        return cls(
+            threshold=settings.get("similarity_threshold", 0.7),
+            max_entries=settings.get("max_entries", 50000),
+            value_tolerance=settings.get("value_tolerance", 0.1),
+            path=settings.get("path", 'duplicate_index.db'),
+        )
+
+    def _band_keys(self, signature):
+        return [(i, signature[i * self.rows:(i + 1) * self.rows]) for i in range(self.bands)]
+
+    def signature(self, apartment):
+        with self._lock:
+            entry = self._entries.get(apartment.canonical_id)
+        if entry is not None:
+            return entry[0]
+        return self.hasher.signature(shingles(listing_fingerprint_text(apartment)))
+
+    def find_duplicate(self, apartment, signature=None):
+        """canonical_id eines ähnlichen, bereits indizierten Listings eines anderen Portals oder None"""
+        signature = signature or self.signature(apartment)
+        own_id = apartment.canonical_id
+        own_values = (apartment.price_value, apartment.size_value)
+        best_id, best_score = None, self.threshold
+        with self._lock:
+            candidates = set()
+            for key in self._band_keys(signature):
+                candidates.update(self._buckets.get(key, ()))
+            candidates.discard(own_id)
+            for candidate in candidates:
+                candidate_signature, source, *values = self._entries[candidate]
+                if source == apartment.source:
+                    continue
+                score = estimate_similarity(signature, candidate_signature)
+                if score >= best_score and values_compatible(own_values, values, self.value_tolerance):
+                    best_id, best_score = candidate, score
+        return best_id
+
+    def add(self, apartment, signature=None):
+        signature = signature or self.signature(apartment)
+        canonical_id = apartment.canonical_id
+        with self._lock:
+            if canonical_id in self._entries:
+                return
+            self._entries[canonical_id] = (signature, apartment.source, apartment.price_value, apartment.size_value)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO signatures VALUES (?, ?, ?, ?, ?, ?)",
+                    (canonical_id, self._signature_format.pack(*signature), apartment.source,
+                     apartment.price_value, apartment.size_value, time.time()),
+                )
+            for key in self._band_keys(signature):
+                self._buckets.setdefault(key, set()).add(canonical_id)
+            while len(self._entries) > self.max_entries:
+                self._evict_oldest()
+
+    def _evict_oldest(self):
+        canonical_id, (signature, *_) = self._entries.popitem(last=False)
+        if self._conn is not None:
+            self._conn.execute("DELETE FROM signatures WHERE canonical_id = ?", (canonical_id,))
+        for key in self._band_keys(signature):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(canonical_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def check_and_add(self, apartment):
+        """Listing indizieren, liefert die ID eines Duplikats oder None"""
+        signature = self.signature(apartment)
+        duplicate_of = self.find_duplicate(apartment, signature)
+        self.add(apartment, signature)
+        return duplicate_of
+
+    def drop_duplicates(self, apartments, logger=None):
+        """Listings ohne Cross-Post-Duplikat; alle werden indiziert
+
+        Signiert wird erst hier, also nur was Seen-Store und Filter überstanden hat.
+        """
+        unique = []
+        for apartment in apartments:
+            duplicate_of = self.check_and_add(apartment)
+            if duplicate_of:
+                if logger is not None:
+                    logger.info(f"Duplikat übersprungen: {apartment.canonical_id} entspricht {duplicate_of}")
+                continue
+            unique.append(apartment)
+        self.flush()
+        return unique
+
+    def flush(self):
+        if self._conn is not None:
+            with self._lock:
+                self._conn.commit()
+
+    def close(self):
+        if self._conn is not None:
+            with self._lock:
+                self._conn.commit()
+                self._conn.close()
+                self._conn = None
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,104 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fetch_engine import DomainThrottle
+
+
+class DetailCache:
+    """Geparste Detailseiten pro canonical_id, jede Seite wird nur einmal geladen"""
+
+    def __init__(self, path='detail_cache.db', max_entries=20000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS details (
+                canonical_id TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_details_fetched ON details (fetched_at)")
+        self._conn.commit()
+
+    def get(self, canonical_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM details WHERE canonical_id = ?", (canonical_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, canonical_id, details):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO details VALUES (?, ?, ?)",
+                (canonical_id, json.dumps(details, ensure_ascii=False), time.time()),
+            )
+            self._conn.execute("""
+                DELETE FROM details WHERE canonical_id IN (
+                    SELECT canonical_id FROM details ORDER BY fetched_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class DetailEnricher:
+    """Lädt Detailseiten für Kandidaten nach, parallel aber höflich pro Host
+
+    Nur Wohnungen, die die günstigen Filter schon bestanden haben, sollten
+    hier landen. Ergebnisse werden pro canonical_id gecacht.
+    """
+
+    def __init__(self, scrapers, config, logger=None):
+        self.logger = logger or logging.getLogger(__name__)
+        settings = config.get("enrichment", {})
+        self.scrapers = {scraper.source: scraper for scraper in scrapers if scraper.detail_extractor}
+        self.max_workers = settings.get("max_workers", 4)
+        self.throttle = DomainThrottle(
+            concurrency=settings.get("per_host_concurrency", 2),
+            min_interval=settings.get("min_host_interval_seconds", 1),
+        )
+        self.cache = DetailCache(settings.get("cache_path", 'detail_cache.db'),
+                                 settings.get("max_entries", 20000))
+
+    def _fetch(self, scraper, apartment):
+        with self.throttle.slot(scraper.domain):
+            return scraper.fetch_details(apartment)
+
+    def enrich(self, apartments):
+        """Details übernehmen (aus dem Cache oder frisch geladen), liefert die Wohnungen zurück"""
+        to_fetch = []
+        for apartment in apartments:
+            scraper = self.scrapers.get(apartment.source)
+            if scraper is None:
+                continue
+            details = self.cache.get(apartment.canonical_id)
+            if details is not None:
+                apartment.apply_details(details)
+            else:
+                to_fetch.append((scraper, apartment))
+
+        if to_fetch:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(to_fetch))) as executor:
+                futures = [(apartment, executor.submit(self._fetch, scraper, apartment))
+                           for scraper, apartment in to_fetch]
+                for apartment, future in futures:
+                    try:
+                        details = future.result()
+                    except Exception as e:
+                        self.logger.error(f"Fehler beim Laden der Detailseite {apartment.url}: {e}")
+                        continue
+                    self.cache.put(apartment.canonical_id, details)
+                    apartment.apply_details(details)
+            self.logger.info(f"{len(to_fetch)} Detailseiten geladen, {len(apartments) - len(to_fetch)} aus dem Cache")
+        return apartments
+
+    def close(self):
+        self.cache.close()
@@ -0,0 +1,81 @@
+import hashlib
+import re
+
+_SIMPLE_SELECTOR = re.compile(r'^([a-zA-Z][a-zA-Z0-9]*|\*)?((?:\.[\w-]+)*)$')
+
+
+def css_to_xpath(selector, prefix='.//'):
+    """Einfache CSS-Selektoren (`tag`, `tag.klasse`, `.a.b`, auch verschachtelt) in XPath übersetzen"""
+    steps = []
+    for part in selector.split():
+        match = _SIMPLE_SELECTOR.match(part)
+        if not match:
+            raise ValueError(f"Nicht unterstützter Selektor: {selector}")
+        tag = match.group(1) or '*'
+        classes = [c for c in match.group(2).split('.') if c]
+        conditions = ''.join(
+            f"[contains(concat(' ', normalize-space(@class), ' '), ' {c} ')]" for c in classes
+        )
+        steps.append(tag + conditions)
+    return prefix + '//'.join(steps)
+
+
+class ListingExtractor:
+    """Extrahiert Listing-Karten per vorkompilierten XPath-Ausdrücken aus lxml
+
+    `selectors` ist reine Daten: `card` ist der Selektor der Karten, `fields`
+    bildet Feldnamen auf einen Selektor (Text) oder ein Tupel (Selektor, Attribut) ab.
+    """
+
+    def __init__(self, selectors):
+        self.selectors = selectors
+        self._card_xpath = None
+        self._field_xpaths = None
+        self._parser = None
+
+    def _compile(self):
+        from lxml import etree, html
+        self._parser = html.HTMLParser(remove_comments=True, remove_pis=True, collect_ids=False)
+        self._card_xpath = etree.XPath(css_to_xpath(self.selectors['card'], prefix='//'))
+        self._field_xpaths = {}
+        for name, spec in self.selectors['fields'].items():
+            if isinstance(spec, (tuple, list)):
+                selector, attribute = spec
+                expression = f"string(({css_to_xpath(selector)})[1]/@{attribute})"
+            else:
+                expression = f"normalize-space(({css_to_xpath(spec)})[1])"
+            self._field_xpaths[name] = etree.XPath(expression)
+
+    def parse(self, content):
+        """HTML-Dokument parsen, liefert das Wurzelelement"""
+        if self._parser is None:
+            self._compile()
+        from lxml import html
+        if isinstance(content, bytes):
+            # Portale liefern UTF-8; ohne meta charset würde libxml2 Latin-1 raten
+            try:
+                return html.document_fromstring(content.decode('utf-8'), parser=self._parser)
+            except (UnicodeDecodeError, ValueError):
+                pass
+        return html.document_fromstring(content, parser=self._parser)
+
+    def cards(self, content):
+        root = self.parse(content)
+        return self._card_xpath(root)
+
+    def extract(self, card):
+        """Alle Felder einer Karte, fehlende Felder als leerer String"""
+        return {name: str(xpath(card)) for name, xpath in self._field_xpaths.items()}
+
+    def field(self, card, name):
+        """Nur ein einzelnes Feld einer Karte"""
+        return str(self._field_xpaths[name](card))
+
+    def fingerprint(self, card):
+        """Digest des rohen HTML-Fragments einer Karte"""
+        from lxml import etree
+        return hashlib.blake2b(etree.tostring(card), digest_size=16).digest()
+
+    def iter_listings(self, content):
+        for card in self.cards(content):
+            yield self.extract(card)
@@ -0,0 +1,140 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from metrics import job_context, registry
+
+
+@dataclass
+class FetchJob:
+    city: str
+    scraper: object
+
+    @property
+    def domain(self):
+        return self.scraper.domain
+
+    @property
+    def key(self):
+        return (self.city, self.scraper.source)
+
+
+class DomainThrottle:
+    """Begrenzt gleichzeitige Zugriffe und Mindestabstand pro Domain"""
+
+    def __init__(self, concurrency=1, min_interval=2.0, overrides=None):
+        self.concurrency = concurrency
+        self.min_interval = min_interval
+        self.overrides = overrides or {}
+        self._lock = threading.Lock()
+        self._semaphores = {}
+        self._next_start = {}
+
+    def _limits(self, domain):
+        override = self.overrides.get(domain, {})
+        return (
+            override.get("concurrency", self.concurrency),
+            override.get("min_interval_seconds", self.min_interval),
+        )
+
+    def _semaphore(self, domain):
+        with self._lock:
+            if domain not in self._semaphores:
+                concurrency, _ = self._limits(domain)
+                self._semaphores[domain] = threading.BoundedSemaphore(max(1, concurrency))
+            return self._semaphores[domain]
+
+    @contextmanager
+    def slot(self, domain):
+        """Slot für eine Domain belegen, wartet ggf. den Mindestabstand ab"""
+        semaphore = self._semaphore(domain)
+        semaphore.acquire()
+        try:
+            _, min_interval = self._limits(domain)
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_start.get(domain, now))
+                self._next_start[domain] = start + min_interval
+            if start > now:
+                time.sleep(start - now)
+            yield
+        finally:
+            semaphore.release()
+
+
+class FetchEngine:
+    """Führt alle (Stadt, Portal)-Jobs parallel aus, höflich pro Domain"""
+
+    def __init__(self, config, logger=None):
+        self.config = config
+        self.logger = logger or logging.getLogger(__name__)
+        scraping = config.get("scraping", {})
+        self.max_workers = scraping.get("max_workers", 8)
+        self.queue_size = scraping.get("stream_queue_size", 100)
+        self.throttle = DomainThrottle(
+            concurrency=scraping.get("per_domain_concurrency", 1),
+            min_interval=scraping.get("min_domain_interval_seconds", 2),
+            overrides=scraping.get("domain_overrides", {}),
+        )
+
+    def _run_job(self, job, is_seen, on_change, results, stop):
+        try:
+            with self.throttle.slot(job.domain), job_context(job.city, job.scraper.source):
+                if stop.is_set():
+                    return
+                self.logger.info(f"Scrape {job.city} ({job.scraper.source})...")
+                for apartment in job.scraper.scrape(job.city, is_seen, on_change):
+                    registry.inc("scraper_listings_total", city=job.city, portal=job.scraper.source)
+                    if not self._put(results, (job, apartment), stop):
+                        return
+        except Exception as e:
+            self.logger.error(f"Fehler im Job {job.city}/{job.scraper.source}: {e}")
+        finally:
+            self._put(results, (job, None), stop)
+
+    @staticmethod
+    def _put(results, item, stop):
+        while not stop.is_set():
+            try:
+                results.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def stream(self, jobs, is_seen=None, on_change=None):
+        """Wohnungen aller Jobs liefern, sobald sie geparst sind
+
+        Liefert (job, apartment); (job, None) markiert das Ende eines Jobs.
+        """
+        if not jobs:
+            return
+        results = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(jobs)))
+        try:
+            for job in jobs:
+                executor.submit(self._run_job, job, is_seen, on_change, results, stop)
+            pending = len(jobs)
+            while pending:
+                job, apartment = results.get()
+                if apartment is None:
+                    pending -= 1
+                yield job, apartment
+        finally:
+            stop.set()
+            executor.shutdown(wait=True)
+
+    def run(self, jobs, is_seen=None, on_change=None):
+        """Jobs ausführen, liefert (job, apartments) in Fertigstellungsreihenfolge"""
+        collected = {}
+        results = []
+        for job, apartment in self.stream(jobs, is_seen, on_change):
+            if apartment is None:
+                results.append((job, collected.pop(id(job), [])))
+            else:
+                collected.setdefault(id(job), []).append(apartment)
+        return results
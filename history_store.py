@@ -0,0 +1,203 @@
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+# Spalten der Historie; Texte wie Titel oder Beschreibung gehören nicht hinein
+COLUMNS = (
+    ('observed_at', 'timestamp'),
+    ('canonical_id', 'string'),
+    ('source', 'string'),
+    ('location', 'string'),
+    ('url', 'string'),
+    ('price_value', 'float64'),
+    ('cold_rent', 'float64'),
+    ('warm_rent', 'float64'),
+    ('rooms_value', 'float64'),
+    ('size_value', 'float64'),
+    ('is_new', 'bool'),
+)
+
+_SECONDS_PER_DAY = 86400
+
+
+class HistoryStore:
+    """Spaltenweise Historie aller beobachteten Wohnungen als Parquet, partitioniert nach Tag
+
+    Jeder Durchlauf hängt eine Datei an `<path>/day=YYYY-MM-DD/`. `compact()`
+    fasst die Dateien abgeschlossener Tage zu einer zusammen. Auswertungen
+    laufen vektorisiert über pyarrow und lesen nur die benötigten Spalten.
+    """
+
+    def __init__(self, path='history', logger=None):
+        import pyarrow as pa
+        self.path = path
+        self.logger = logger or logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self.schema = pa.schema([
+            (name, pa.timestamp('s', tz='UTC') if kind == 'timestamp' else pa.type_for_alias(kind))
+            for name, kind in COLUMNS
+        ])
+        os.makedirs(path, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config, logger=None):
+        """Historie aus der Konfiguration, None wenn deaktiviert oder pyarrow fehlt"""
+        logger = logger or logging.getLogger(__name__)
+        settings = config.get("history", {})
+        if not settings.get("enabled", True):
+            return None
+        try:
+            store = cls(settings.get("path", 'history'), logger)
+        except ImportError:
+            logger.warning("pyarrow nicht installiert, Historie deaktiviert")
+            return None
+        store.import_legacy_json()
+        return store
+
+    def _partition(self, day):
+        return os.path.join(self.path, f"day={day}")
+
+    @staticmethod
+    def _write(table, file_path):
+        # Versteckte Temp-Datei, damit Leser nie eine halb geschriebene Datei sehen
+        import pyarrow.parquet as pq
+        directory, name = os.path.split(file_path)
+        tmp_path = os.path.join(directory, f".{name}.tmp")
+        pq.write_table(table, tmp_path, compression='zstd')
+        os.replace(tmp_path, file_path)
+
+    def append(self, apartments, new_ids=(), observed_at=None):
+        """Eine Beobachtung pro Wohnung anhängen; `new_ids` markiert Erstsichtungen"""
+        if not apartments:
+            return None
+        import pyarrow as pa
+        observed_at = observed_at or datetime.now(timezone.utc)
+        new_ids = set(new_ids)
+        rows = {name: [] for name, _ in COLUMNS}
+        for apartment in apartments:
+            canonical_id = apartment.canonical_id
+            rows['observed_at'].append(observed_at)
+            rows['canonical_id'].append(canonical_id)
+            rows['source'].append(apartment.source)
+            rows['location'].append(apartment.location)
+            rows['url'].append(apartment.url)
+            rows['price_value'].append(apartment.price_value)
+            rows['cold_rent'].append(apartment.cold_rent)
+            rows['warm_rent'].append(apartment.warm_rent)
+            rows['rooms_value'].append(apartment.rooms_value)
+            rows['size_value'].append(apartment.size_value)
+            rows['is_new'].append(canonical_id in new_ids)
+        table = pa.table(rows, schema=self.schema)
+        partition = self._partition(observed_at.astimezone(timezone.utc).strftime('%Y-%m-%d'))
+        with self._lock:
+            os.makedirs(partition, exist_ok=True)
+            file_path = os.path.join(partition, f"part-{observed_at.strftime('%H%M%S')}-{uuid.uuid4().hex[:8]}.parquet")
+            self._write(table, file_path)
+        return file_path
+
+    def compact(self, include_today=False):
+        """Mehrteilige Tagespartitionen zu je einer Datei zusammenfassen; liefert die Anzahl"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+        compacted = 0
+        with self._lock:
+            for partition in sorted(glob.glob(os.path.join(self.path, 'day=*'))):
+                if not include_today and partition.endswith(today):
+                    continue
+                parts = sorted(glob.glob(os.path.join(partition, '*.parquet')))
+                if len(parts) < 2:
+                    continue
+                tables = [pq.read_table(part, schema=self.schema) for part in parts]
+                merged = pa.concat_tables(tables).sort_by('observed_at')
+                target = os.path.join(partition, f"compacted-{int(time.time())}.parquet")
+                self._write(merged, target)
+                for part in parts:
+                    os.remove(part)
+                compacted += 1
+        if compacted:
+            self.logger.info(f"{compacted} Tagespartitionen der Historie kompaktiert")
+        return compacted
+
+    def import_legacy_json(self, pattern='new_apartments_*.json'):
+        """Alte new_apartments_*.json übernehmen und als .migrated umbenennen"""
+        from apartment import Apartment
+        for file_path in sorted(glob.glob(pattern)):
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    apartments = [Apartment.from_dict(data) for data in json.load(f)]
+                stamp = os.path.basename(file_path)[len('new_apartments_'):-len('.json')]
+                observed_at = datetime.strptime(stamp, '%Y%m%d_%H%M%S').astimezone(timezone.utc)
+            except (ValueError, TypeError, json.JSONDecodeError) as e:
+                self.logger.error(f"{file_path} konnte nicht übernommen werden: {e}")
+                continue
+            self.append(apartments, [apartment.canonical_id for apartment in apartments], observed_at)
+            os.rename(file_path, f"{file_path}.migrated")
+            self.logger.info(f"{file_path} in die Historie übernommen")
+
+    def table(self, columns=None, since=None, source=None):
+        """Historie als pyarrow-Tabelle, nur die angefragten Spalten"""
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        if not glob.glob(os.path.join(self.path, 'day=*', '*.parquet')):
+            return self.schema.empty_table().select(columns or self.schema.names)
+        dataset = ds.dataset(self.path, format='parquet', schema=self.schema, partitioning=None)
+        condition = None
+        if since is not None:
+            condition = ds.field('observed_at') >= pa.scalar(since, type=self.schema.field('observed_at').type)
+        if source is not None:
+            by_source = ds.field('source') == source
+            condition = by_source if condition is None else condition & by_source
+        return dataset.to_table(columns=columns, filter=condition)
+
+    def price_per_sqm_trend(self, since=None, source=None):
+        """Mittlerer und medianer Preis pro m² je Tag und Portal, nur Erstsichtungen"""
+        import pyarrow.compute as pc
+        table = self.table(['observed_at', 'source', 'price_value', 'size_value', 'is_new'], since, source)
+        table = table.filter(pc.and_(table['is_new'], pc.greater(table['size_value'], 0)))
+        table = table.append_column('day', pc.strftime(table['observed_at'], format='%Y-%m-%d'))
+        table = table.append_column('price_per_sqm', pc.divide(table['price_value'], table['size_value']))
+        result = table.group_by(['day', 'source']).aggregate([
+            ('price_per_sqm', 'mean'),
+            ('price_per_sqm', 'approximate_median'),
+            ('price_per_sqm', 'count'),
+        ])
+        return result.sort_by([('day', 'ascending'), ('source', 'ascending')]).to_pylist()
+
+    def time_on_market(self, since=None, source=None):
+        """Tage zwischen erster und letzter Beobachtung je Anzeige, zusammengefasst je Portal
+
+        Bekannte Anzeigen werden nur bis zum frühen Abbruch der Paginierung
+        erneut beobachtet, die Werte sind daher Untergrenzen.
+        """
+        import pyarrow.compute as pc
+        table = self.table(['observed_at', 'canonical_id', 'source'], since, source)
+        seconds = pc.cast(pc.cast(table['observed_at'], 'int64'), 'float64')
+        table = table.set_column(0, 'observed_at', seconds)
+        listings = table.group_by(['canonical_id', 'source']).aggregate([
+            ('observed_at', 'min'),
+            ('observed_at', 'max'),
+        ])
+        days = pc.divide(pc.subtract(listings['observed_at_max'], listings['observed_at_min']), _SECONDS_PER_DAY)
+        listings = listings.append_column('days', days)
+        result = listings.group_by('source').aggregate([
+            ('days', 'mean'),
+            ('days', 'approximate_median'),
+            ('days', 'max'),
+            ('canonical_id', 'count'),
+        ])
+        return result.sort_by('source').to_pylist()
+
+    def portal_volume(self, since=None, source=None):
+        """Neue Anzeigen je Tag und Portal"""
+        import pyarrow.compute as pc
+        table = self.table(['observed_at', 'canonical_id', 'source', 'is_new'], since, source)
+        table = table.filter(table['is_new'])
+        table = table.append_column('day', pc.strftime(table['observed_at'], format='%Y-%m-%d'))
+        result = table.group_by(['day', 'source']).aggregate([('canonical_id', 'count_distinct')])
+        return result.sort_by([('day', 'ascending'), ('source', 'ascending')]).to_pylist()
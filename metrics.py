@@ -0,0 +1,191 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_context = threading.local()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def job_labels():
+    """Labels des Jobs, der im aktuellen Thread läuft"""
+    return getattr(_context, 'labels', {'city': '*', 'portal': '*'})
+
+
+@contextmanager
+def job_context(city, portal):
+    """Messwerte im aktuellen Thread diesem (Stadt, Portal)-Job zuordnen"""
+    previous = getattr(_context, 'labels', None)
+    _context.labels = {'city': city, 'portal': portal}
+    try:
+        yield
+    finally:
+        if previous is None:
+            del _context.labels
+        else:
+            _context.labels = previous
+
+
+class MetricsRegistry:
+    """Counter und Histogramme mit Labels, ausgebbar im Prometheus-Textformat"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._help = {}
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def describe(self, name, text):
+        self._help[name] = text
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * len(self.buckets), 0, 0.0]
+            counts = histogram[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            histogram[1] += 1
+            histogram[2] += value
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    @staticmethod
+    def _format_labels(labels, extra=()):
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+    def render(self):
+        """Alle Werte im Prometheus-Textformat"""
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items())
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{self._format_labels(labels)} {value}")
+        for (name, labels), (counts, count, total) in histograms:
+            if name not in typed:
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f"{name}_bucket{self._format_labels(labels, [('le', bound)])} {bucket_count}")
+            lines.append(f"{name}_bucket{self._format_labels(labels, [('le', '+Inf')])} {count}")
+            lines.append(f"{name}_sum{self._format_labels(labels)} {total}")
+            lines.append(f"{name}_count{self._format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def write_file(self, path):
+        """Atomar in eine Datei schreiben (z.B. für den node_exporter textfile collector)"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+    def start_http_server(self, port, address='127.0.0.1'):
+        """/metrics in einem Hintergrund-Thread ausliefern"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != '/metrics':
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((address, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+
+registry = MetricsRegistry()
+registry.describe("scraper_stage_seconds", "Dauer je Verarbeitungsschritt und (Stadt, Portal)-Job")
+registry.describe("scraper_http_requests_total", "HTTP-Antworten nach Host und Statuscode")
+registry.describe("scraper_http_bytes_total", "Übertragene Bytes (Antwort-Body) nach Host")
+registry.describe("scraper_parse_failures_total", "Karten, die nicht geparst werden konnten")
+registry.describe("scraper_empty_pages_total", "Erste Ergebnisseiten ohne Karten (Selektoren prüfen)")
+registry.describe("scraper_cards_unchanged_total", "Karten, deren HTML seit dem letzten Durchlauf gleich ist")
+registry.describe("scraper_price_changes_total", "Bekannte Anzeigen mit geändertem Preis")
+registry.describe("scraper_listings_total", "Gelieferte Wohnungen je Job")
+registry.describe("scraper_notifications_total", "Zustellungen je Kanal und Ergebnis")
+
+
+@contextmanager
+def profile(output_path, logger=None):
+    """Einen Block mit pyinstrument (*.html) oder cProfile profilieren"""
+    logger = logger or logging.getLogger(__name__)
+    if output_path.endswith('.html'):
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            logger.warning("pyinstrument nicht installiert, nutze cProfile")
+            output_path = output_path[:-len('.html')] + '.prof'
+        else:
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                with open(output_path, 'w', encoding='utf-8') as f:
+                    f.write(profiler.output_html())
+                logger.info(f"Profil geschrieben: {output_path}")
+            return
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(output_path)
+        logger.info(f"Profil geschrieben: {output_path}")
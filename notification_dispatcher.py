@@ -0,0 +1,155 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+from apartment import Apartment
+
+
+class NotificationDispatcher:
+    """Benachrichtigungen im Hintergrund bündeln und zustellen
+
+    Wohnungen werden gesammelt, bis `batch_size` erreicht ist oder
+    `batch_seconds` seit der ersten wartenden Wohnung vergangen sind, und dann
+    mit `deliver(apartments)` zugestellt. Fehlgeschlagene Zustellungen werden
+    mit Backoff wiederholt. Alles noch nicht Zugestellte steht in der Outbox-Datei
+    und wird beim nächsten Start erneut versendet. `on_delivered(apartments)`
+    wird nach jeder erfolgreichen Zustellung aufgerufen, bevor die Wohnungen
+    die Outbox verlassen.
+    """
+
+    def __init__(self, deliver, config, logger=None, on_delivered=None):
+        self.deliver = deliver
+        self.on_delivered = on_delivered
+        self.logger = logger or logging.getLogger(__name__)
+        settings = config.get("notification", {}).get("dispatch", {})
+        self.batch_size = settings.get("batch_size", 20)
+        self.batch_seconds = settings.get("batch_seconds", 30)
+        self.max_retries = settings.get("max_retries", 5)
+        self.backoff_base = settings.get("backoff_base_seconds", 5)
+        self.backoff_max = settings.get("backoff_max_seconds", 300)
+        self.outbox_path = settings.get("outbox_path", 'undelivered_notifications.jsonl')
+        self._pending = {}
+        self._queue = []
+        self._first_queued_at = None
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._thread = None
+        self._load_outbox()
+
+    def _load_outbox(self):
+        if not os.path.exists(self.outbox_path):
+            return
+        try:
+            with open(self.outbox_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        apartment = Apartment.from_dict(json.loads(line))
+                        self._pending[apartment.canonical_id] = apartment
+                        self._queue.append(apartment)
+        except (OSError, ValueError) as e:
+            self.logger.error(f"Fehler beim Laden der Outbox {self.outbox_path}: {e}")
+        if self._queue:
+            self._first_queued_at = time.monotonic()
+            self.logger.info(f"{len(self._queue)} nicht zugestellte Benachrichtigungen aus {self.outbox_path} geladen")
+
+    def _write_outbox(self):
+        """Outbox atomar mit allen noch nicht zugestellten Wohnungen überschreiben"""
+        tmp_path = f"{self.outbox_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for apartment in self._pending.values():
+                f.write(json.dumps(apartment.to_dict(), ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.outbox_path)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="notification-dispatcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def submit(self, apartments):
+        """Wohnungen zur Zustellung einreihen, kehrt sofort zurück"""
+        if not apartments:
+            return
+        with self._condition:
+            for apartment in apartments:
+                if apartment.canonical_id in self._pending:
+                    continue
+                self._pending[apartment.canonical_id] = apartment
+                self._queue.append(apartment)
+            if self._first_queued_at is None:
+                self._first_queued_at = time.monotonic()
+            self._write_outbox()
+            self._condition.notify()
+
+    def is_pending(self, canonical_id):
+        """Wartet diese Wohnung noch auf ihre Zustellung?"""
+        with self._condition:
+            return canonical_id in self._pending
+
+    def _next_batch(self):
+        with self._condition:
+            while True:
+                if self._queue:
+                    waited = time.monotonic() - self._first_queued_at
+                    if self._stopping or len(self._queue) >= self.batch_size or waited >= self.batch_seconds:
+                        batch = self._queue[:self.batch_size]
+                        del self._queue[:self.batch_size]
+                        self._first_queued_at = time.monotonic() if self._queue else None
+                        return batch
+                    self._condition.wait(self.batch_seconds - waited)
+                elif self._stopping:
+                    return None
+                else:
+                    self._condition.wait()
+
+    def _deliver_with_retry(self, batch):
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.deliver(batch)
+                return True
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    self.logger.error(f"Zustellung fehlgeschlagen, bleibt in {self.outbox_path}: {e}")
+                    return False
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+                self.logger.warning(f"Zustellung fehlgeschlagen ({e}), neuer Versuch in {delay:.1f}s")
+                with self._condition:
+                    if self._stopping:
+                        return False
+                    self._condition.wait(delay)
+        return False
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            delivered = self._deliver_with_retry(batch)
+            if delivered and self.on_delivered is not None:
+                try:
+                    self.on_delivered(batch)
+                except Exception as e:
+                    self.logger.error(f"Fehler nach der Zustellung: {e}")
+            with self._condition:
+                if delivered:
+                    for apartment in batch:
+                        self._pending.pop(apartment.canonical_id, None)
+                    self._write_outbox()
+                elif not self._stopping:
+                    # Später erneut versuchen, die Outbox hält die Wohnungen bis dahin
+                    self._queue.extend(batch)
+                    if self._first_queued_at is None:
+                        self._first_queued_at = time.monotonic()
+
+    def stop(self, timeout=60):
+        """Restliche Wohnungen zustellen und den Hintergrund-Thread beenden"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
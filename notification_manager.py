@@ -1,51 +1,72 @@
 import logging
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from datetime import datetime
+import threading
+from notification_sinks import render_batch
 
 class NotificationManager:
     def __init__(self, config, logger=None):
         self.config = config
         self.logger = logger or logging.getLogger(__name__)
+        self._server = None
+        self._lock = threading.Lock()
 
-    def send_email_notification(self, apartments):
-        if not self.config["notification"]["email"]["enabled"]:
+    def _connection(self, smtp_config):
+        """Bestehende SMTP-Verbindung wiederverwenden, sonst neu aufbauen"""
+        import smtplib
+        if self._server is not None:
+            try:
+                if self._server.noop()[0] == 250:
+                    return self._server
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.close()
+        server = smtplib.SMTP(smtp_config["smtp_server"], smtp_config["smtp_port"],
+                              timeout=smtp_config.get("timeout_seconds", 30))
+        server.starttls()
+        server.login(smtp_config["sender_email"], smtp_config["sender_password"])
+        self._server = server
+        return server
+
+    def close(self):
+        if self._server is None:
             return
+        import smtplib
         try:
-            smtp_config = self.config["notification"]["email"]
-            msg = MIMEMultipart()
-            msg['From'] = smtp_config["sender_email"]
-            msg['To'] = smtp_config["recipient_email"]
-            msg['Subject'] = f"Neue Wohnungsangebote gefunden! ({len(apartments)} Angebote)"
-            body = f"""
-            Hallo!
+            self._server.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        self._server = None
 
-            Ich habe {len(apartments)} neue Wohnungsangebote gefunden, die Ihren Kriterien entsprechen:
+    def build_message(self, apartments, rendered=None):
+        # email erst beim ersten Versand laden, das spart beim Start Importzeit
+        from email.mime.text import MIMEText
+        from email.mime.multipart import MIMEMultipart
+        smtp_config = self.config["notification"]["email"]
+        rendered = rendered or render_batch(apartments)
+        msg = MIMEMultipart()
+        msg['From'] = smtp_config["sender_email"]
+        msg['To'] = smtp_config["recipient_email"]
+        msg['Subject'] = rendered.subject
+        msg.attach(MIMEText(rendered.text, 'plain', 'utf-8'))
+        return msg
 
-            """
-            for i, apartment in enumerate(apartments, 1):
-                body += f"""
-                {i}. {apartment.title}
-                Preis: {apartment.price}
-                Ort: {apartment.location}
-                Zimmer: {apartment.rooms}
-                Größe: {apartment.size}
-                Quelle: {apartment.source}
-                Link: {apartment.url}
-                
-            """
-            body += f"""
-            Viel Erfolg bei der Wohnungssuche!
+    def deliver(self, apartments, rendered=None):
+        """E-Mail über die gepoolte Verbindung senden, Fehler werden weitergereicht"""
+        if not self.config["notification"]["email"]["enabled"]:
+            return
+        import smtplib
+        smtp_config = self.config["notification"]["email"]
+        msg = self.build_message(apartments, rendered)
+        with self._lock:
+            try:
+                self._connection(smtp_config).send_message(msg)
+            except smtplib.SMTPServerDisconnected:
+                # Verbindung wurde zwischen NOOP und Senden geschlossen
+                self.close()
+                self._connection(smtp_config).send_message(msg)
+        self.logger.info(f"E-Mail-Benachrichtigung für {len(apartments)} Wohnungen gesendet")
 
-            Gesendet am: {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}
-            """
-            msg.attach(MIMEText(body, 'plain', 'utf-8'))
-            server = smtplib.SMTP(smtp_config["smtp_server"], smtp_config["smtp_port"])
-            server.starttls()
-            server.login(smtp_config["sender_email"], smtp_config["sender_password"])
-            server.send_message(msg)
-            server.quit()
-            self.logger.info(f"E-Mail-Benachrichtigung für {len(apartments)} Wohnungen gesendet")
+    def send_email_notification(self, apartments):
+        try:
+            self.deliver(apartments)
         except Exception as e:
             self.logger.error(f"Fehler beim Senden der E-Mail: {e}")
@@ -0,0 +1,262 @@
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from datetime import datetime
+from functools import partial
+from metrics import registry
+
+
+@dataclass
+class RenderedBatch:
+    subject: str
+    text: str
+    # Einzelteile von `text`, damit Kanäle mit Längenlimit an Wohnungsgrenzen teilen können
+    header: str = ""
+    listings: tuple = ()
+    footer: str = ""
+
+
+def render_batch(apartments):
+    """Betreff und Text einer Charge einmal rendern, alle Kanäle nutzen dasselbe Ergebnis"""
+    header = "\n".join([
+        "Hallo!",
+        "",
+        f"Ich habe {len(apartments)} neue Wohnungsangebote gefunden, die Ihren Kriterien entsprechen:",
+        "",
+    ])
+    listings = tuple(
+        "\n".join([
+            f"{i}. {apartment.title}",
+            f"   Preis: {apartment.price}",
+            f"   Ort: {apartment.location}",
+            f"   Zimmer: {apartment.rooms}",
+            f"   Größe: {apartment.size}",
+            f"   Quelle: {apartment.source}",
+            f"   Link: {apartment.url}",
+            "",
+        ])
+        for i, apartment in enumerate(apartments, 1)
+    )
+    footer = "\n".join([
+        "Viel Erfolg bei der Wohnungssuche!",
+        "",
+        f"Gesendet am: {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}",
+    ])
+    return RenderedBatch(
+        subject=f"Neue Wohnungsangebote gefunden! ({len(apartments)} Angebote)",
+        text="\n".join([header, *listings, footer]),
+        header=header,
+        listings=listings,
+        footer=footer,
+    )
+
+
+class NotificationSink:
+    """Ein Benachrichtigungskanal; `send` wirft bei Fehlern"""
+    name = None
+
+    def __init__(self, settings, logger=None):
+        self.settings = settings
+        self.timeout = settings.get("timeout_seconds", 10)
+        self.logger = logger or logging.getLogger(__name__)
+
+    def send(self, apartments, rendered):
+        raise NotImplementedError
+
+
+class EmailSink(NotificationSink):
+    name = "email"
+
+    def __init__(self, settings, notification_manager, logger=None):
+        super().__init__(settings, logger)
+        self.timeout = settings.get("timeout_seconds", 30)
+        self.notification_manager = notification_manager
+
+    def send(self, apartments, rendered):
+        self.notification_manager.deliver(apartments, rendered)
+
+
+class WebhookSink(NotificationSink):
+    """POST mit JSON-Payload an eine beliebige URL"""
+    name = "webhook"
+
+    def send(self, apartments, rendered):
+        import requests
+        payload = {
+            "subject": rendered.subject,
+            "text": rendered.text,
+            "apartments": [apartment.to_dict() for apartment in apartments],
+        }
+        response = requests.post(self.settings["url"], json=payload,
+                                 headers=self.settings.get("headers", {}), timeout=self.timeout)
+        response.raise_for_status()
+
+
+class TelegramSink(NotificationSink):
+    """Nachrichten über die Telegram Bot API, lange Chargen auf mehrere Nachrichten verteilt"""
+    name = "telegram"
+    max_length = 4096
+
+    def messages(self, rendered):
+        """Text in Nachrichten bis `max_length` Zeichen teilen, nur zwischen zwei Wohnungen"""
+        messages = []
+        current = rendered.header
+        for part in (*rendered.listings, rendered.footer):
+            # Eine einzelne Wohnung über dem Limit (sehr langer Titel) wird als einzige gekürzt
+            part = part[:self.max_length]
+            if current and len(current) + 1 + len(part) > self.max_length:
+                messages.append(current)
+                current = part
+            else:
+                current = f"{current}\n{part}" if current else part
+        if current:
+            messages.append(current)
+        return messages
+
+    def send(self, apartments, rendered):
+        import requests
+        api_url = self.settings.get("api_url", "https://api.telegram.org")
+        for text in self.messages(rendered):
+            response = requests.post(
+                f"{api_url}/bot{self.settings['bot_token']}/sendMessage",
+                json={"chat_id": self.settings["chat_id"], "text": text, "disable_web_page_preview": True},
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+
+
+class FileSink(NotificationSink):
+    """Text an eine Datei anhängen, `-` schreibt auf stdout"""
+    name = "file"
+
+    def __init__(self, settings, logger=None):
+        super().__init__(settings, logger)
+        self._lock = threading.Lock()
+
+    def send(self, apartments, rendered):
+        path = self.settings.get("path", "-")
+        block = f"{rendered.subject}\n{rendered.text}\n\n"
+        with self._lock:
+            if path == "-":
+                sys.stdout.write(block)
+                sys.stdout.flush()
+            else:
+                with open(path, 'a', encoding='utf-8') as f:
+                    f.write(block)
+
+
+class MultiChannelNotifier:
+    """Verteilt jede Charge parallel an alle aktiven Kanäle
+
+    Jeder Kanal hat sein eigenes Timeout. Schlägt ein Kanal fehl, wird eine
+    Exception geworfen; beim erneuten Versuch derselben Wohnungen werden nur die
+    Kanäle bedient, die sie noch nicht erhalten haben. Ein Versand, der nach
+    dem Timeout weiterläuft, wird beim erneuten Versuch abgewartet statt
+    wiederholt, und zählt als zugestellt, sobald er doch noch gelingt.
+    """
+    max_completed = 10000
+
+    def __init__(self, config, notification_manager, logger=None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.sinks = self.build_sinks(config.get("notification", {}), notification_manager)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, 2 * len(self.sinks)),
+                                            thread_name_prefix="notification-sink")
+        self._delivered = {}
+        # Zuletzt vollständig zugestellte Wohnungen, damit ein später Erfolg den Wiederholungsversuch leert
+        self._completed = OrderedDict()
+        # (Kanal, IDs der Charge) -> Future eines Versands, der das Timeout überschritten hat
+        self._running = {}
+        self._lock = threading.Lock()
+
+    def build_sinks(self, settings, notification_manager):
+        sinks = []
+        if settings.get("email", {}).get("enabled"):
+            sinks.append(EmailSink(settings["email"], notification_manager, self.logger))
+        for sink_cls in (WebhookSink, TelegramSink, FileSink):
+            sink_settings = settings.get(sink_cls.name, {})
+            if sink_settings.get("enabled"):
+                sinks.append(sink_cls(sink_settings, self.logger))
+        return sinks
+
+    def _missing_sinks(self, apartments):
+        with self._lock:
+            return [sink for sink in self.sinks
+                    if any(a.canonical_id not in self._completed
+                           and sink.name not in self._delivered.get(a.canonical_id, ()) for a in apartments)]
+
+    def _mark_delivered(self, apartments, sink):
+        with self._lock:
+            for apartment in apartments:
+                done = self._delivered.setdefault(apartment.canonical_id, set())
+                done.add(sink.name)
+                if len(done) == len(self.sinks):
+                    del self._delivered[apartment.canonical_id]
+                    self._completed[apartment.canonical_id] = True
+            while len(self._completed) > self.max_completed:
+                self._completed.popitem(last=False)
+
+    def _submit(self, sink, batch_ids, apartments, rendered):
+        """Versand starten oder einen noch laufenden Versand derselben Charge übernehmen
+
+        Liefert (Future, übernommen); übernommene Versände verbucht `_late_done`.
+        """
+        with self._lock:
+            future = self._running.get((sink.name, batch_ids))
+        if future is not None:
+            self.logger.info(f"Kanal {sink.name}: warte auf den noch laufenden Versand")
+            return future, True
+        return self._executor.submit(sink.send, apartments, rendered), False
+
+    def _track_late(self, sink, batch_ids, apartments, future):
+        with self._lock:
+            if (sink.name, batch_ids) in self._running:
+                return
+            self._running[(sink.name, batch_ids)] = future
+        future.add_done_callback(partial(self._late_done, sink, batch_ids, apartments))
+
+    def _late_done(self, sink, batch_ids, apartments, future):
+        with self._lock:
+            self._running.pop((sink.name, batch_ids), None)
+        if future.cancelled() or future.exception() is not None:
+            return
+        registry.inc("scraper_notifications_total", sink=sink.name, result="late")
+        self._mark_delivered(apartments, sink)
+        self.logger.info(f"Kanal {sink.name}: {len(apartments)} Wohnungen verspätet gesendet")
+
+    def deliver(self, apartments):
+        sinks = self._missing_sinks(apartments)
+        if not sinks:
+            return
+        rendered = render_batch(apartments)
+        batch_ids = tuple(apartment.canonical_id for apartment in apartments)
+        started = time.monotonic()
+        futures = [(sink, *self._submit(sink, batch_ids, apartments, rendered)) for sink in sinks]
+        failed = []
+        for sink, future, reused in futures:
+            try:
+                future.result(timeout=max(0, started + sink.timeout - time.monotonic()))
+            except FutureTimeoutError:
+                self.logger.error(f"Kanal {sink.name}: Zeitüberschreitung nach {sink.timeout}s")
+                registry.inc("scraper_notifications_total", sink=sink.name, result="timeout")
+                self._track_late(sink, batch_ids, apartments, future)
+                failed.append(sink.name)
+            except Exception as e:
+                self.logger.error(f"Kanal {sink.name}: Fehler beim Senden: {e}")
+                registry.inc("scraper_notifications_total", sink=sink.name, result="error")
+                failed.append(sink.name)
+            else:
+                if reused:
+                    continue
+                registry.inc("scraper_notifications_total", sink=sink.name, result="ok")
+                self._mark_delivered(apartments, sink)
+                self.logger.info(f"Kanal {sink.name}: {len(apartments)} Wohnungen gesendet")
+        registry.observe("scraper_stage_seconds", time.monotonic() - started, stage="notify", city="*", portal="*")
+        if failed:
+            raise RuntimeError(f"Zustellung fehlgeschlagen für: {', '.join(failed)}")
+
+    def close(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,352 @@
+"""Viele Suchprofile mit einem gemeinsamen Abruf bedienen
+
+Jede (Portal, Stadt)-Abfrage wird pro Durchlauf nur einmal geladen, egal wie
+viele Profile sie abonniert haben. Die Abfragen werden nach Domain auf
+Prozesse verteilt, sodass Drosselung und Rate Limit pro Domain weiter in
+einem Prozess gelten. Die Ergebnisse werden danach an Seen-Store, Filter und
+Benachrichtigung jedes Profils verteilt.
+
+Aufruf: python profile_runner.py [--config scraper_config.json] [--profiles profiles.json] [--once]
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from apartment import Apartment
+from criteria_filter import CriteriaFilter
+from dedup import NearDuplicateIndex
+from ebay_kleinanzeigen_scraper import EbayKleinanzeigenScraper
+from fetch_engine import FetchEngine, FetchJob
+from immobilienscout24_scraper import Immobilienscout24Scraper
+from metrics import registry as metrics
+from notification_dispatcher import NotificationDispatcher
+from notification_manager import NotificationManager
+from notification_sinks import MultiChannelNotifier
+from scheduler import run_scheduled
+from seen_store import SeenStore
+from wg_gesucht_scraper import WgGesuchtScraper
+
+logger = logging.getLogger(__name__)
+
+PORTALS = {cls.source: cls for cls in (Immobilienscout24Scraper, WgGesuchtScraper, EbayKleinanzeigenScraper)}
+
+
+def merge_config(base, override):
+    """`override` rekursiv über `base` legen, ohne eines von beiden zu verändern"""
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_config(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def loosest_criteria(criteria_list):
+    """Weiteste Portal-Abfrage, die alle Profile abdeckt; genau filtert jedes Profil selbst"""
+    def pick(key, choose):
+        values = [c.get(key) for c in criteria_list]
+        return None if any(v is None for v in values) else choose(values)
+
+    return {
+        "max_price": pick("max_price", max),
+        "min_rooms": pick("min_rooms", min),
+        "max_rooms": pick("max_rooms", max),
+    }
+
+
+# Zustand eines Worker-Prozesses, bleibt über Durchläufe erhalten
+_worker_state = {}
+
+
+def _worker_scraper(config, source, criteria):
+    """Scraper im Worker wiederverwenden, damit sein Karten-Fingerprint-Cache erhalten bleibt"""
+    if not _worker_state:
+        from rate_limiter import BROWSER_HEADERS, RateLimitedSession
+        from response_cache import ResponseCache
+        import replay
+
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        session = RateLimitedSession(config, logger)
+        session.headers.update(BROWSER_HEADERS)
+        replay_config = config.get("replay", {})
+        if replay_config.get("mode"):
+            replay.install(session, replay_config["mode"], replay_config.get("directory", 'recordings'))
+        _worker_state.update(session=session, cache=ResponseCache.from_config(config, logger), scrapers={})
+    key = (source, json.dumps(criteria, sort_keys=True))
+    scraper = _worker_state["scrapers"].get(key)
+    if scraper is None:
+        scraper = PORTALS[source](merge_config(config, {"search_criteria": criteria}),
+                                  _worker_state["session"], logger, _worker_state["cache"])
+        _worker_state["scrapers"][key] = scraper
+    return scraper
+
+
+def _fetch_shard(config, shard):
+    """Worker: alle Abfragen einer Domain laden, liefert (Portal, Stadt, Wohnungen als dict, fehlgeschlagen)
+
+    Für Abfragen mit `refresh` werden die gecachten Seiten vorher verworfen:
+    ihre Ergebnisse wurden zuletzt geladen, aber nie an die Profile verteilt.
+    """
+    storage = config.get("storage", {})
+    fetched = SeenStore(os.path.join(config["profiles"]["state_dir"], 'fetched.db'), storage.get("seen_ttl_days"), logger)
+    try:
+        jobs = []
+        for source, city, criteria, refresh in shard:
+            scraper = _worker_scraper(config, source, criteria)
+            if refresh:
+                scraper.forget_cached_pages(city)
+            jobs.append(FetchJob(city, scraper))
+        is_seen = lambda apartment: apartment.get_hash() in fetched
+        return [(job.scraper.source, job.city, [apartment.to_dict() for apartment in apartments],
+                 job.city in job.scraper.failures)
+                for job, apartments in FetchEngine(config, logger).run(jobs, is_seen)]
+    finally:
+        fetched.close()
+
+
+class SearchProfile:
+    """Zustand eines Abonnenten: eigener Seen-Store, eigene Kriterien, eigene Kanäle"""
+
+    def __init__(self, name, config, state_dir, logger=None):
+        self.name = name
+        self.config = config
+        self.logger = logger or logging.getLogger(__name__)
+        self.cities = config["search_criteria"].get("cities", [])
+        self.portals = config["scraping"].get("portals") or list(PORTALS)
+        directory = os.path.join(state_dir, name)
+        os.makedirs(directory, exist_ok=True)
+        self.config = merge_config(config, {
+            "notification": {"dispatch": {"outbox_path": os.path.join(directory, 'undelivered_notifications.jsonl')}}
+        })
+        self.seen = SeenStore(os.path.join(directory, 'seen_apartments.db'),
+                              config.get("storage", {}).get("seen_ttl_days"), self.logger)
+        self.criteria_filter = CriteriaFilter(config["search_criteria"])
+        # Pro Profil, damit nur Cross-Posts unter den eigenen Treffern zählen
+        self.duplicate_index = NearDuplicateIndex.from_config(
+            merge_config(config, {"dedup": {"path": os.path.join(directory, 'duplicate_index.db')}})
+        )
+        self.notifier = NotificationManager(self.config, self.logger)
+        self.channels = MultiChannelNotifier(self.config, self.notifier, self.logger)
+        self.dispatcher = NotificationDispatcher(self.channels.deliver, self.config, self.logger,
+                                                 on_delivered=self.mark_seen).start()
+
+    def mark_seen(self, apartments):
+        self.seen.add_many(apartment.get_hash() for apartment in apartments)
+        self.seen.flush()
+
+    def accept(self, apartments):
+        """Neue Wohnungen filtern und einreihen; liefert die passenden
+
+        Abgelehnte und Cross-Post-Duplikate gelten sofort als gesehen, passende
+        erst nach der Zustellung.
+        """
+        new = [apartment for apartment in apartments
+               if apartment.get_hash() not in self.seen and not self.dispatcher.is_pending(apartment.canonical_id)]
+        if not new:
+            return []
+        matching = self.criteria_filter.filter(new)
+        self.criteria_filter.reset_stats()
+        if self.duplicate_index is not None:
+            matching = self.duplicate_index.drop_duplicates(matching, self.logger)
+        if matching:
+            self.logger.info(f"Profil {self.name}: {len(matching)} passende Wohnungen")
+            self.dispatcher.submit(matching)
+        matched = {apartment.canonical_id for apartment in matching}
+        self.mark_seen([apartment for apartment in new if apartment.canonical_id not in matched])
+        return matching
+
+    def close(self):
+        self.dispatcher.stop()
+        self.channels.close()
+        self.notifier.close()
+        if self.duplicate_index is not None:
+            self.duplicate_index.close()
+        self.seen.close()
+
+
+class ProfileRunner:
+    """Gemeinsamer Abruf für alle Profile, verteilt auf einen Prozess-Pool"""
+
+    def __init__(self, config, profiles, logger=None):
+        self.logger = logger or logging.getLogger(__name__)
+        settings = config.get("profiles", {})
+        self.state_dir = settings.get("state_dir", 'profiles')
+        self.max_processes = settings.get("max_processes", 4)
+        # Die Worker öffnen fetched.db im selben Verzeichnis
+        self.config = merge_config(config, {"profiles": {"state_dir": self.state_dir}})
+        os.makedirs(self.state_dir, exist_ok=True)
+        self.unfanned_path = os.path.join(self.state_dir, 'unfanned_queries.json')
+        self.profiles = [
+            SearchProfile(
+                profile["name"],
+                merge_config(config, {key: value for key, value in profile.items() if key != "name"}),
+                self.state_dir,
+                self.logger,
+            )
+            for profile in profiles
+        ]
+        storage = config.get("storage", {})
+        # Was schon an alle Abonnenten verteilt wurde, muss nicht erneut geladen werden
+        self.fetched = SeenStore(os.path.join(self.state_dir, 'fetched.db'), storage.get("seen_ttl_days"), self.logger)
+        self.jobs, self.subscribers = self.build_jobs()
+        self._executors = {}
+        self._slots = {}
+
+    @classmethod
+    def from_files(cls, config_file='scraper_config.json', profiles_file=None, logger=None):
+        with open(config_file, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        profiles_file = profiles_file or config.get("profiles", {}).get("path", 'profiles.json')
+        with open(profiles_file, 'r', encoding='utf-8') as f:
+            profiles = json.load(f)
+        return cls(config, profiles["profiles"] if isinstance(profiles, dict) else profiles, logger)
+
+    def build_jobs(self):
+        """Eindeutige Abfragen über alle Profile; liefert (Jobs, Profile je Job-Schlüssel)"""
+        grouped = defaultdict(list)
+        for profile in self.profiles:
+            for city in profile.cities:
+                for source in profile.portals:
+                    grouped[(source, city)].append(profile)
+
+        jobs = {}
+        subscribers = defaultdict(list)
+        for (source, city), profiles in grouped.items():
+            criteria = loosest_criteria([p.config["search_criteria"] for p in profiles])
+            scraper = PORTALS[source](merge_config(self.config, {"search_criteria": criteria}), None, self.logger)
+            query_key = scraper.query_key(city)
+            if query_key not in jobs:
+                jobs[query_key] = FetchJob(city, scraper)
+            subscribers[jobs[query_key].key].extend(profiles)
+        self.logger.info(f"{len(self.profiles)} Profile, {len(jobs)} eindeutige Abfragen")
+        return list(jobs.values()), subscribers
+
+    def _shards(self, jobs, refresh=()):
+        """Eine Shard pro Domain, damit Drosselung und Rate Limit pro Domain gelten"""
+        by_domain = defaultdict(list)
+        for job in jobs:
+            by_domain[job.domain].append(
+                (job.scraper.source, job.city, job.scraper.config["search_criteria"], job.key in refresh)
+            )
+        return by_domain
+
+    def _load_unfanned(self):
+        """Abfragen, deren Ergebnisse geladen, aber (noch) nicht verteilt wurden"""
+        if not os.path.exists(self.unfanned_path):
+            return set()
+        with open(self.unfanned_path, 'r', encoding='utf-8') as f:
+            return {tuple(key) for key in json.load(f)}
+
+    def _save_unfanned(self, keys):
+        tmp_path = f"{self.unfanned_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(sorted(list(key) for key in keys), f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.unfanned_path)
+
+    def _worker(self, domain):
+        """Fester Worker-Prozess je Domain, damit dessen Scraper-Caches jeden Durchlauf treffen
+
+        Bei mehr Domains als `max_processes` teilen sich Domains einen Prozess.
+        """
+        slot = self._slots.setdefault(domain, len(self._slots) % max(1, self.max_processes))
+        if slot not in self._executors:
+            # spawn statt fork: Dispatcher-Threads halten Locks, die ein fork mitkopieren würde
+            self._executors[slot] = ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return self._executors[slot]
+
+    def fan_out(self, job_key, apartments):
+        """Ergebnisse einer Abfrage an alle Abonnenten verteilen
+
+        Liefert (Anzahl neuer Wohnungen, passende Wohnungen pro Profil).
+        """
+        new = [apartment for apartment in apartments if apartment.get_hash() not in self.fetched]
+        accepted = {profile.name: profile.accept(new) for profile in self.subscribers[job_key]}
+        # Erst wenn jedes Profil abgelehnt oder in seine Outbox geschrieben hat
+        self.fetched.add_many(apartment.get_hash() for apartment in new)
+        self.fetched.flush()
+        return len(new), accepted
+
+    def run_jobs(self, jobs):
+        """Durchlauf über die gegebenen Abfragen; liefert (passende pro Profil, neue pro Job)
+
+        Die Worker speichern die Seiten im Response-Cache, sobald sie sie laden.
+        Jede Abfrage steht deshalb bis zur Verteilung ihrer Ergebnisse in
+        `unfanned_queries.json`; fällt eine Shard oder der Hauptprozess vorher
+        aus, lädt der nächste Durchlauf ihre Seiten am Cache vorbei neu.
+        """
+        matching = defaultdict(list)
+        new_per_job = {}
+        unfanned = self._load_unfanned()
+        refresh = unfanned & {job.key for job in jobs}
+        unfanned |= {job.key for job in jobs}
+        self._save_unfanned(unfanned)
+        futures = [self._worker(domain).submit(_fetch_shard, self.config, shard)
+                   for domain, shard in self._shards(jobs, refresh).items()]
+        errors = []
+        for future in futures:
+            try:
+                results = future.result()
+            except Exception as e:
+                self.logger.error(f"Shard fehlgeschlagen, Abfragen werden beim nächsten Mal neu geladen: {e}")
+                errors.append(e)
+                continue
+            for source, city, apartment_dicts, failed in results:
+                apartments = [Apartment.from_dict(data) for data in apartment_dicts]
+                metrics.inc("scraper_listings_total", len(apartments), city=city, portal=source)
+                new_per_job[(city, source)], accepted_per_profile = self.fan_out((city, source), apartments)
+                for name, accepted in accepted_per_profile.items():
+                    matching[name].extend(accepted)
+                if not failed:
+                    unfanned.discard((city, source))
+        self._save_unfanned(unfanned)
+        if errors:
+            raise errors[0]
+        return matching, new_per_job
+
+    def run_once(self):
+        matching, _ = self.run_jobs(self.jobs)
+        total = sum(len(apartments) for apartments in matching.values())
+        self.logger.info(f"Durchlauf beendet: {total} Treffer für {len(matching)} Profile")
+        return matching
+
+    def run_continuous(self):
+        """Jede Abfrage im eigenen, adaptiven Takt (siehe AdaptiveScheduler)"""
+        run_scheduled(self.jobs, self.config, self.run_jobs, self.logger)
+        self.close()
+
+    def close(self):
+        for executor in self._executors.values():
+            executor.shutdown()
+        self._executors = {}
+        for profile in self.profiles:
+            profile.close()
+        self.fetched.close()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Scraping für viele Suchprofile")
+    parser.add_argument('--config', default='scraper_config.json')
+    parser.add_argument('--profiles', default=None, help="Profildatei (Standard: profiles.path aus der Konfiguration)")
+    parser.add_argument('--once', action='store_true', help="Nur einen Durchlauf ausführen")
+    args = parser.parse_args()
+    runner = ProfileRunner.from_files(args.config, args.profiles, logger)
+    if args.once:
+        runner.run_once()
+        runner.close()
+    else:
+        runner.run_continuous()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+import requests
+from metrics import job_labels, registry
+
+RETRY_STATUS_CODES = (429, 502, 503, 504)
+
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
+    'Accept-Language': 'de-DE,de;q=0.9,en;q=0.8',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'DNT': '1',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+    'Sec-Fetch-Dest': 'document',
+    'Sec-Fetch-Mode': 'navigate',
+    'Sec-Fetch-Site': 'none',
+    'Cache-Control': 'max-age=0'
+}
+
+
+class CircuitOpenError(requests.RequestException):
+    """Host ist wegen wiederholter Fehler vorübergehend gesperrt"""
+
+
+class TokenBucket:
+    """Token Bucket: erlaubt `rate` Anfragen pro Sekunde mit Burst `capacity`"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Blockiert bis ein Token verfügbar ist"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def drain(self, seconds):
+        """Bucket leeren, sodass frühestens nach `seconds` wieder ein Token frei ist"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 1 - seconds * self.rate)
+
+
+class CircuitBreaker:
+    """Sperrt einen Host nach zu vielen Fehlern für `reset_timeout` Sekunden"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=600):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        with self._lock:
+            return self._opened_at is not None and time.monotonic() - self._opened_at < self.reset_timeout
+
+    def allow(self):
+        """Geschlossen oder halb offen (Sperrzeit abgelaufen) lässt Anfragen durch"""
+        return not self.is_open
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+class RateLimitedSession(requests.Session):
+    """requests.Session mit Token Bucket, Backoff und Circuit Breaker pro Host"""
+
+    def __init__(self, config=None, logger=None):
+        super().__init__()
+        self.logger = logger or logging.getLogger(__name__)
+        settings = (config or {}).get("rate_limit", {})
+        self.requests_per_second = settings.get("requests_per_second", 0.5)
+        self.burst = settings.get("burst", 2)
+        self.max_retries = settings.get("max_retries", 3)
+        self.backoff_base = settings.get("backoff_base_seconds", 2)
+        self.backoff_max = settings.get("backoff_max_seconds", 120)
+        self.failure_threshold = settings.get("circuit_failure_threshold", 5)
+        self.reset_timeout = settings.get("circuit_reset_seconds", 600)
+        self.host_overrides = settings.get("hosts", {})
+        self._buckets = {}
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, host):
+        with self._lock:
+            if host not in self._buckets:
+                override = self.host_overrides.get(host, {})
+                self._buckets[host] = TokenBucket(
+                    override.get("requests_per_second", self.requests_per_second),
+                    override.get("burst", self.burst),
+                )
+            return self._buckets[host]
+
+    def _breaker(self, host):
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self._breakers[host]
+
+    def _backoff(self, attempt):
+        """Exponentieller Backoff mit Full Jitter"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _retry_after(self, response):
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            seconds = float(value)
+        except ValueError:
+            from email.utils import parsedate_to_datetime
+            try:
+                retry_at = parsedate_to_datetime(value)
+            except (TypeError, ValueError):
+                return None
+            seconds = (retry_at - datetime.now(timezone.utc)).total_seconds()
+        return max(0.0, min(seconds, self.backoff_max))
+
+    @staticmethod
+    def _record(host, response, total_seconds):
+        """Verbindungsaufbau bis Header (DNS/Connect/TTFB) und Download getrennt erfassen"""
+        labels = job_labels()
+        connect = response.elapsed.total_seconds()
+        registry.observe("scraper_stage_seconds", connect, stage="connect", **labels)
+        registry.observe("scraper_stage_seconds", max(0.0, total_seconds - connect), stage="download", **labels)
+        registry.inc("scraper_http_requests_total", host=host, status=str(response.status_code))
+        registry.inc("scraper_http_bytes_total", len(response.content), host=host)
+
+    def request(self, method, url, *args, **kwargs):
+        host = urlparse(url).netloc
+        bucket = self._bucket(host)
+        breaker = self._breaker(host)
+        if not breaker.allow():
+            raise CircuitOpenError(f"{host} ist nach wiederholten Fehlern vorübergehend gesperrt")
+
+        for attempt in range(self.max_retries + 1):
+            bucket.acquire()
+            started = time.perf_counter()
+            try:
+                response = super().request(method, url, *args, **kwargs)
+            except requests.RequestException as e:
+                registry.inc("scraper_http_requests_total", host=host, status="error")
+                breaker.record_failure()
+                if attempt >= self.max_retries or not breaker.allow():
+                    raise
+                delay = self._backoff(attempt)
+                self.logger.warning(f"Verbindungsfehler bei {host} ({e}), neuer Versuch in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            self._record(host, response, time.perf_counter() - started)
+
+            if response.status_code not in RETRY_STATUS_CODES:
+                breaker.record_success()
+                return response
+
+            breaker.record_failure()
+            if attempt >= self.max_retries or not breaker.allow():
+                return response
+            delay = self._retry_after(response)
+            if delay is None:
+                delay = self._backoff(attempt)
+            else:
+                # Retry-After gilt für den ganzen Host, nicht nur für diese Anfrage
+                bucket.drain(delay)
+            self.logger.warning(f"{host} antwortet mit {response.status_code}, neuer Versuch in {delay:.1f}s")
+            time.sleep(delay)
+        return response
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import timedelta
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+# Nur diese Header werden aufgezeichnet; der Body wird dekodiert gespeichert
+_KEPT_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Retry-After', 'Location')
+
+
+def request_key(method, url):
+    return f"{method.upper()} {url}"
+
+
+class RecordingStore:
+    """Aufgezeichnete Antworten: index.json plus eine Body-Datei pro Anfrage"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.index_path = os.path.join(directory, 'index.json')
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.index = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.index = json.load(f)
+
+    def put(self, method, url, status, headers, body):
+        key = request_key(method, url)
+        body_file = hashlib.sha1(key.encode()).hexdigest() + '.body'
+        with open(os.path.join(self.directory, body_file), 'wb') as f:
+            f.write(body)
+        with self._lock:
+            self.index[key] = {
+                'status': status,
+                'headers': {name: headers[name] for name in _KEPT_HEADERS if name in headers},
+                'body_file': body_file,
+            }
+            tmp_path = f"{self.index_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.index, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.index_path)
+
+    def get(self, method, url):
+        """(status, headers, body) oder None"""
+        entry = self.index.get(request_key(method, url))
+        if entry is None:
+            return None
+        with open(os.path.join(self.directory, entry['body_file']), 'rb') as f:
+            body = f.read()
+        return entry['status'], entry['headers'], body
+
+
+class RecordingAdapter(HTTPAdapter):
+    """Echte Anfragen senden und jede Antwort zusätzlich auf Platte ablegen"""
+
+    def __init__(self, store, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        self.store.put(request.method, request.url, response.status_code, response.headers, response.content)
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """Antworten ausschließlich aus der Aufzeichnung liefern, unbekannte URLs ergeben 404"""
+
+    def __init__(self, store):
+        super().__init__()
+        self.store = store
+
+    def send(self, request, **kwargs):
+        recorded = self.store.get(request.method, request.url)
+        response = requests.Response()
+        if recorded is None:
+            status, headers, body = 404, {}, b''
+        else:
+            status, headers, body = recorded
+        response.status_code = status
+        response.reason = 'OK' if status == 200 else ''
+        response.headers = CaseInsensitiveDict(headers)
+        response._content = body
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.elapsed = timedelta(0)
+        return response
+
+    def close(self):
+        pass
+
+
+def install(session, mode, directory):
+    """Session auf Aufnahme (`record`) oder Wiedergabe (`replay`) umstellen"""
+    store = RecordingStore(directory)
+    if mode == 'record':
+        adapter = RecordingAdapter(store)
+    elif mode == 'replay':
+        adapter = ReplayAdapter(store)
+    else:
+        raise ValueError(f"Unbekannter Replay-Modus: {mode}")
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return store
@@ -0,0 +1,129 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+
+import requests
+
+
+class ResponseCache:
+    """Persistenter HTTP-Cache mit ETag/Last-Modified und Body-Hash pro URL"""
+
+    def __init__(self, path='response_cache.db', max_entries=1000, ttl_seconds=24 * 3600, logger=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.logger = logger or logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                body_hash BLOB,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)")
+        self._conn.commit()
+
+    @classmethod
+    def from_config(cls, config, logger=None):
+        settings = config.get("cache", {})
+        if not settings.get("enabled", True):
+            return None
+        return cls(
+            path=settings.get("path", 'response_cache.db'),
+            max_entries=settings.get("max_entries", 1000),
+            ttl_seconds=settings.get("ttl_hours", 24) * 3600,
+            logger=logger,
+        )
+
+    def _entry(self, url):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, body_hash, stored_at FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None or time.time() - row[3] > self.ttl_seconds:
+            return None
+        return row
+
+    def conditional_headers(self, url):
+        """If-None-Match / If-Modified-Since für eine bekannte URL"""
+        entry = self._entry(url)
+        headers = {}
+        if entry:
+            etag, last_modified, _, _ = entry
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+        return headers
+
+    def is_unchanged(self, url, response):
+        """True bei 304 oder wenn der Body identisch mit dem letzten Abruf ist"""
+        entry = self._entry(url)
+        if entry is None:
+            return False
+        if response.status_code == 304:
+            self._touch(url)
+            return True
+        if response.status_code == 200 and hashlib.sha1(response.content).digest() == entry[2]:
+            self._touch(url)
+            return True
+        return False
+
+    def _touch(self, url):
+        with self._lock:
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+
+    def store(self, url, response):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (url, response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                 hashlib.sha1(response.content).digest(), now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def forget(self, url):
+        """Eintrag verwerfen, der nächste Abruf gilt dann als geändert"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+            self._conn.commit()
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM responses WHERE stored_at < ?", (now - self.ttl_seconds,))
+        self._conn.execute("""
+            DELETE FROM responses WHERE url IN (
+                SELECT url FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_entries,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def cache_key(url, params=None):
+    """Vollständige URL, unter der eine Seite im Cache steht"""
+    return requests.Request('GET', url, params=params).prepare().url
+
+
+def fetch_page(session, cache, url, params=None):
+    """Seite abrufen, mit Cache als bedingte Anfrage. Liefert (response, changed)"""
+    if cache is None:
+        return session.get(url, params=params), True
+    full_url = cache_key(url, params)
+    response = session.get(full_url, headers=cache.conditional_headers(full_url))
+    if cache.is_unchanged(full_url, response):
+        return response, False
+    if response.status_code == 200:
+        cache.store(full_url, response)
+    return response, True
@@ -0,0 +1,145 @@
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from datetime import datetime
+
+
+class FeedState:
+    """Beobachtete Rate neuer Anzeigen eines (Stadt, Portal)-Feeds"""
+    __slots__ = ('job', 'rate_per_hour', 'interval', 'last_run', 'failures')
+
+    def __init__(self, job, interval):
+        self.job = job
+        self.rate_per_hour = None
+        self.interval = interval
+        self.last_run = None
+        self.failures = 0
+
+
+class AdaptiveScheduler:
+    """Prioritätswarteschlange über alle Jobs mit adaptivem Abfrageintervall
+
+    Jeder Feed wird so oft abgefragt, dass pro Abfrage etwa
+    `target_new_per_poll` neue Anzeigen zu erwarten sind, begrenzt auf
+    [min_interval, max_interval]. Nachts wird das Intervall gestreckt, Fehler
+    verdoppeln es. Startzeiten und Intervalle werden leicht gejittert, damit
+    nicht alle Feeds gleichzeitig fällig werden.
+    """
+
+    def __init__(self, jobs, config, logger=None):
+        self.logger = logger or logging.getLogger(__name__)
+        scraping = config.get("scraping", {})
+        settings = scraping.get("schedule", {})
+        self.base_interval = scraping.get("interval_minutes", 30) * 60
+        self.min_interval = settings.get("min_interval_minutes", 5) * 60
+        self.max_interval = settings.get("max_interval_minutes", 120) * 60
+        self.target_new_per_poll = settings.get("target_new_per_poll", 1.0)
+        self.smoothing = settings.get("smoothing", 0.3)
+        self.start_jitter = settings.get("start_jitter_seconds", 60)
+        self.jitter_fraction = settings.get("jitter_fraction", 0.1)
+        self.quiet_hours = settings.get("quiet_hours", [0, 6])
+        self.quiet_factor = settings.get("quiet_factor", 3.0)
+        self._heap = []
+        self._counter = itertools.count()
+        self._feeds = {}
+        self._stop = threading.Event()
+        now = time.time()
+        for job in jobs:
+            self._feeds[job.key] = FeedState(job, self.base_interval)
+            self._push(job.key, now + random.uniform(0, self.start_jitter))
+
+    def _push(self, key, run_at):
+        heapq.heappush(self._heap, (run_at, next(self._counter), key))
+
+    def _is_quiet(self, timestamp):
+        start, end = self.quiet_hours
+        hour = datetime.fromtimestamp(timestamp).hour
+        return start <= hour < end if start <= end else hour >= start or hour < end
+
+    def _next_interval(self, feed, now):
+        if feed.rate_per_hour:
+            interval = self.target_new_per_poll / feed.rate_per_hour * 3600
+        else:
+            interval = self.max_interval if feed.rate_per_hour == 0 else self.base_interval
+        interval = min(self.max_interval, max(self.min_interval, interval))
+        if self._is_quiet(now):
+            interval = min(self.max_interval, interval * self.quiet_factor)
+        if feed.failures:
+            interval = min(self.max_interval, interval * (2 ** feed.failures))
+        return interval * random.uniform(1 - self.jitter_fraction, 1 + self.jitter_fraction)
+
+    def record(self, job, new_count, failed=False, now=None):
+        """Ergebnis eines Laufs verbuchen und den Job neu einplanen"""
+        now = now or time.time()
+        feed = self._feeds[job.key]
+        if failed:
+            feed.failures += 1
+        else:
+            feed.failures = 0
+            if feed.last_run is not None:
+                hours = max((now - feed.last_run) / 3600, 1e-3)
+                observed = new_count / hours
+                if feed.rate_per_hour is None:
+                    feed.rate_per_hour = observed
+                else:
+                    feed.rate_per_hour += self.smoothing * (observed - feed.rate_per_hour)
+            feed.last_run = now
+        feed.interval = self._next_interval(feed, now)
+        self._push(job.key, now + feed.interval)
+        self.logger.debug(f"{job.city}/{job.scraper.source}: nächster Lauf in {feed.interval / 60:.1f} Minuten")
+
+    def pop_due(self, now=None):
+        """Alle fälligen Jobs entnehmen"""
+        now = now or time.time()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, _, key = heapq.heappop(self._heap)
+            due.append(self._feeds[key].job)
+        return due
+
+    def wait(self):
+        """Bis zum nächsten fälligen Job warten; False, wenn gestoppt wurde"""
+        timeout = max(0, self._heap[0][0] - time.time()) if self._heap else None
+        return not self._stop.wait(timeout)
+
+    def stop(self):
+        self._stop.set()
+
+    @property
+    def stopped(self):
+        return self._stop.is_set()
+
+
+def run_scheduled(jobs, config, run_jobs, logger=None):
+    """Jobs im adaptiven Takt ausführen, bis SIGINT oder SIGTERM kommt
+
+    `run_jobs(due)` liefert (Ergebnis, neue Wohnungen pro Job-Schlüssel). Ein
+    Signal beendet die Schleife erst nach dem laufenden Durchlauf.
+    """
+    import signal
+    logger = logger or logging.getLogger(__name__)
+    scheduler = AdaptiveScheduler(jobs, config, logger)
+
+    def shutdown(signum, frame):
+        logger.info("Beende nach dem laufenden Durchlauf...")
+        scheduler.stop()
+
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, shutdown)
+
+    while not scheduler.stopped:
+        due = scheduler.pop_due()
+        if not due:
+            scheduler.wait()
+            continue
+        try:
+            _, new_per_job = run_jobs(due)
+            for job in due:
+                scheduler.record(job, new_per_job.get(job.key, 0))
+        except Exception as e:
+            logger.error(f"Unerwarteter Fehler: {e}")
+            for job in due:
+                scheduler.record(job, 0, failed=True)
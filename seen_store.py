@@ -0,0 +1,91 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+
+
+def to_digest(key):
+    """Schlüssel als 16-Byte-Digest: Bytes bleiben, MD5-Hex wird dekodiert, sonst gehasht"""
+    if isinstance(key, bytes):
+        return key
+    if len(key) == 32:
+        try:
+            return bytes.fromhex(key)
+        except ValueError:
+            pass
+    return hashlib.md5(key.encode()).digest()
+
+
+class SeenStore:
+    """Indizierte Menge bereits gesehener Wohnungen in SQLite
+
+    Verhält sich wie ein Set (`in`, `add`, `len`), schreibt aber nur die
+    Änderungen. `flush()` committet, abgelaufene Einträge werden per TTL entfernt.
+    """
+
+    def __init__(self, path='seen_apartments.db', ttl_days=None, logger=None):
+        self.path = path
+        self.ttl_seconds = ttl_days * 86400 if ttl_days else None
+        self.logger = logger or logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS seen (
+                digest BLOB PRIMARY KEY,
+                first_seen REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_seen_first_seen ON seen (first_seen)")
+        self._conn.commit()
+        self.expire()
+
+    def __contains__(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM seen WHERE digest = ?", (to_digest(key),)).fetchone()
+        return row is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+
+    def add(self, key):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO seen VALUES (?, ?)", (to_digest(key), time.time())
+            )
+
+    def add_many(self, keys):
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO seen VALUES (?, ?)", ((to_digest(key), now) for key in keys)
+            )
+
+    def discard(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM seen WHERE digest = ?", (to_digest(key),))
+
+    def flush(self):
+        with self._lock:
+            self._conn.commit()
+
+    def expire(self):
+        """Einträge älter als die TTL löschen"""
+        if not self.ttl_seconds:
+            return 0
+        with self._lock:
+            deleted = self._conn.execute(
+                "DELETE FROM seen WHERE first_seen < ?", (time.time() - self.ttl_seconds,)
+            ).rowcount
+            self._conn.commit()
+        if deleted:
+            self.logger.info(f"{deleted} abgelaufene Einträge aus {self.path} entfernt")
+        return deleted
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
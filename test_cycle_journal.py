@@ -0,0 +1,92 @@
+import json
+import os
+import tempfile
+import unittest
+
+import benchmark
+from apartment import Apartment
+from apartment_scraper import ApartmentScraper
+from cycle_journal import CycleJournal
+
+
+def apartment(listing_id):
+    return Apartment(f"Wohnung {listing_id}", "800 €", "Soest", "3", "75 m²",
+                     f"https://www.wg-gesucht.de/{listing_id}.html", "WG-Gesucht", listing_id=listing_id)
+
+
+class CycleJournalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.workdir.name, 'cycle_journal.jsonl')
+        self.journal = CycleJournal(self.path)
+
+    def tearDown(self):
+        self.workdir.cleanup()
+
+    def test_resume_returns_finished_jobs(self):
+        self.journal.begin([("Soest", "WG-Gesucht"), ("Soest", "ImmobilienScout24")])
+        self.journal.checkpoint(("Soest", "WG-Gesucht"), [apartment("1"), apartment("2")])
+        resumed = CycleJournal(self.path)
+        finished = resumed.resume()
+        self.assertEqual(list(finished), [("Soest", "WG-Gesucht")])
+        self.assertEqual([a.listing_id for a in finished[("Soest", "WG-Gesucht")]], ["1", "2"])
+        self.assertEqual(resumed.cycle, self.journal.cycle)
+        resumed.commit()
+        self.assertEqual(CycleJournal(self.path).resume(), {})
+
+    def test_truncated_trailing_line_is_dropped(self):
+        self.journal.begin([("Soest", "WG-Gesucht"), ("Soest", "eBay Kleinanzeigen")])
+        self.journal.checkpoint(("Soest", "WG-Gesucht"), [apartment("1")])
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write('{"type": "job", "key": ["Soest", "eBay')
+        resumed = CycleJournal(self.path)
+        self.assertEqual(list(resumed.resume()), [("Soest", "WG-Gesucht")])
+        # Der nächste Eintrag beginnt auf einer eigenen Zeile
+        resumed.checkpoint(("Soest", "eBay Kleinanzeigen"), [apartment("2")])
+        finished = CycleJournal(self.path).resume()
+        self.assertEqual(set(finished), {("Soest", "WG-Gesucht"), ("Soest", "eBay Kleinanzeigen")})
+
+
+class ResumeWithOutboxTest(unittest.TestCase):
+    """Abbruch nach dem Einreihen in die Outbox, aber vor dem Abschluss des Durchlaufs"""
+
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.previous_dir = os.getcwd()
+        os.chdir(self.workdir.name)
+        config = benchmark.benchmark_config(self.workdir.name, 5)
+        config['search_criteria']['keywords'] = []
+        config['dedup']['enabled'] = False
+        config['notification']['file'] = {"enabled": True, "path": 'notifications.txt'}
+        config['notification']['dispatch'].update({"batch_seconds": 0, "max_retries": 0})
+        self.config_path = 'scraper_config.json'
+        with open(self.config_path, 'w', encoding='utf-8') as f:
+            json.dump(config, f)
+
+    def tearDown(self):
+        os.chdir(self.previous_dir)
+        self.workdir.cleanup()
+
+    def test_pending_listing_is_not_alerted_again(self):
+        pending = apartment("4711")
+        journal = CycleJournal('cycle_journal.jsonl')
+        journal.begin([("Soest", "WG-Gesucht")])
+        journal.checkpoint(("Soest", "WG-Gesucht"), [pending])
+        with open('undelivered_notifications.jsonl', 'w', encoding='utf-8') as f:
+            f.write(json.dumps(pending.to_dict(), ensure_ascii=False) + "\n")
+
+        # Ohne Aufzeichnungen liefern alle übrigen Jobs 404
+        app = ApartmentScraper(self.config_path)
+        try:
+            new_apartments = app.run_once()
+        finally:
+            app.close()
+        self.assertEqual(new_apartments, [])
+        with open('notifications.txt', encoding='utf-8') as f:
+            self.assertEqual(f.read().count(f"Link: {pending.url}\n"), 1)
+        self.assertEqual(CycleJournal('cycle_journal.jsonl').resume(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
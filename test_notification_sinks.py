@@ -0,0 +1,161 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from apartment import Apartment
+from notification_sinks import MultiChannelNotifier, NotificationSink, TelegramSink, render_batch
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Lokaler Webhook-Empfänger; antwortet der Reihe nach mit `server.statuses`"""
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.server.received.append(json.loads(body))
+        status = self.server.statuses.pop(0) if self.server.statuses else 200
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class BlockingSink(NotificationSink):
+    """Kanal, der bis zur Freigabe hängt, wie ein SMTP-Server ohne Antwort"""
+    name = "blocking"
+
+    def __init__(self, timeout):
+        super().__init__({"timeout_seconds": timeout})
+        self.release = threading.Event()
+        self.calls = 0
+        self.finished = threading.Event()
+
+    def send(self, apartments, rendered):
+        self.calls += 1
+        self.release.wait(10)
+        self.finished.set()
+
+
+def apartment(listing_id):
+    return Apartment(f"Wohnung {listing_id}", "800 €", "Soest", "3", "75 m²",
+                     f"https://www.wg-gesucht.de/{listing_id}.html", "WG-Gesucht", listing_id=listing_id)
+
+
+class MultiChannelNotifierTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+        self.server.received = []
+        self.server.statuses = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.workdir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.workdir.name, 'notifications.txt')
+        config = {"notification": {
+            "webhook": {"enabled": True, "url": f"http://127.0.0.1:{self.server.server_port}/hook",
+                        "timeout_seconds": 5},
+            "file": {"enabled": True, "path": self.file_path},
+        }}
+        self.notifier = MultiChannelNotifier(config, None)
+        self.batch = [apartment("1"), apartment("2")]
+
+    def tearDown(self):
+        for sink in self.notifier.sinks:
+            if isinstance(sink, BlockingSink):
+                sink.release.set()
+        self.notifier.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.workdir.cleanup()
+
+    def file_blocks(self):
+        with open(self.file_path, encoding='utf-8') as f:
+            return f.read().count("Neue Wohnungsangebote gefunden!")
+
+    def test_slow_sink_does_not_delay_the_others(self):
+        blocking = BlockingSink(timeout=0.3)
+        self.notifier.sinks.append(blocking)
+        started = time.monotonic()
+        with self.assertRaisesRegex(RuntimeError, "blocking"):
+            self.notifier.deliver(self.batch)
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(len(self.server.received), 1)
+        self.assertEqual(len(self.server.received[0]["apartments"]), 2)
+        self.assertEqual(self.file_blocks(), 1)
+
+    def test_retry_only_resends_to_failed_channel(self):
+        self.server.statuses = [500]
+        with self.assertRaisesRegex(RuntimeError, "webhook"):
+            self.notifier.deliver(self.batch)
+        self.notifier.deliver(self.batch)
+        self.assertEqual(len(self.server.received), 2)
+        self.assertEqual(self.file_blocks(), 1)
+
+    def test_late_success_counts_as_delivered(self):
+        blocking = BlockingSink(timeout=0.2)
+        self.notifier.sinks.append(blocking)
+        with self.assertRaises(RuntimeError):
+            self.notifier.deliver(self.batch)
+        blocking.release.set()
+        self.assertTrue(blocking.finished.wait(5))
+        # Der Done-Callback läuft direkt nach send im Worker-Thread
+        deadline = time.monotonic() + 5
+        while self.notifier._missing_sinks(self.batch) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.notifier.deliver(self.batch)
+        self.assertEqual(blocking.calls, 1)
+        self.assertEqual(len(self.server.received), 1)
+
+    def test_retry_waits_for_running_send_instead_of_resending(self):
+        blocking = BlockingSink(timeout=0.2)
+        self.notifier.sinks.append(blocking)
+        with self.assertRaises(RuntimeError):
+            self.notifier.deliver(self.batch)
+        blocking.timeout = 5
+        threading.Timer(0.2, blocking.release.set).start()
+        self.notifier.deliver(self.batch)
+        self.assertEqual(blocking.calls, 1)
+        self.assertEqual(len(self.server.received), 1)
+        self.assertEqual(self.file_blocks(), 1)
+
+
+class TelegramSinkTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+        self.server.received = []
+        self.server.statuses = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.sink = TelegramSink({"api_url": f"http://127.0.0.1:{self.server.server_port}",
+                                  "bot_token": "token", "chat_id": "42"})
+        self.batch = [apartment(str(i)) for i in range(1, 41)]
+        for item in self.batch:
+            item.title = f"Helle 3-Zimmer-Wohnung mit Balkon und Einbauküche, ruhige Lage {item.listing_id} " * 2
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_long_batch_is_split_on_listing_boundaries(self):
+        self.sink.send(self.batch, render_batch(self.batch))
+        texts = [message["text"] for message in self.server.received]
+        self.assertGreater(len(texts), 1)
+        self.assertTrue(all(len(text) <= TelegramSink.max_length for text in texts))
+        for item in self.batch:
+            self.assertEqual(sum(text.count(f"Link: {item.url}\n") for text in texts), 1)
+        self.assertTrue(texts[0].startswith("Hallo!"))
+        self.assertIn("Viel Erfolg", texts[-1])
+
+    def test_failed_part_fails_the_sink(self):
+        import requests
+        self.server.statuses = [200, 500]
+        with self.assertRaises(requests.HTTPError):
+            self.sink.send(self.batch, render_batch(self.batch))
+
+
+if __name__ == '__main__':
+    unittest.main()